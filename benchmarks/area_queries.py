@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Compare radius and nearest actor queries against scanning every actor on a crowded floor.
+
+Run from the project root with `python -m benchmarks.area_queries`.
+
+The scans are the loops the fireball and lightning scrolls used before `GameMap.get_actors_in_radius` and
+`GameMap.get_nearest_visible_actors`.  Each query is made around random positions and checked against its scan.
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional
+import argparse
+import random
+import time
+
+import game.engine
+import game.entity
+import game.entity_factories
+import game.game_map
+import game.tiles
+
+
+def build_floor(monsters: int, size: int) -> game.game_map.GameMap:
+    """Return an open floor with monsters on random tiles, all of it visible."""
+    random.seed(0)
+    player = game.entity_factories.spawn(game.entity_factories.player)
+    engine = game.engine.Engine(player=player)
+    engine.game_map = game_map = game.game_map.GameMap(engine, size, size)
+    game_map.tiles[...] = game.tiles.floor
+    game_map.visible[...] = True
+    player.place(size // 2, size // 2, game_map)
+    for _ in range(monsters):
+        game.entity_factories.spawn(game.entity_factories.orc).place(
+            random.randrange(size), random.randrange(size), game_map
+        )
+    return game_map
+
+
+def scan_in_radius(game_map: game.game_map.GameMap, x: int, y: int, radius: int) -> List[game.entity.Actor]:
+    return [actor for actor in game_map.actors if actor.distance(x, y) <= radius]
+
+
+def scan_nearest(game_map: game.game_map.GameMap, x: int, y: int, max_distance: int) -> Optional[game.entity.Actor]:
+    target = None
+    closest_distance = float("inf")
+    for actor in game_map.actors:
+        if game_map.visible[actor.x, actor.y]:
+            distance = actor.distance(x, y)
+            if distance <= max_distance and distance < closest_distance:
+                target = actor
+                closest_distance = distance
+    return target
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--monsters", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=300, help="Width and height of the floor.")
+    parser.add_argument("--radius", type=int, default=3, help="Radius of the area query, like a fireball.")
+    parser.add_argument("--range", type=int, default=5, help="Range of the nearest query, like a lightning bolt.")
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    game_map = build_floor(args.monsters, args.size)
+    positions = [(random.randrange(args.size), random.randrange(args.size)) for _ in range(args.queries)]
+    for x, y in positions[:100]:
+        expected = scan_in_radius(game_map, x, y, args.radius)
+        assert set(game_map.get_actors_in_radius(x, y, args.radius)) == set(expected)
+        nearest = game_map.get_nearest_visible_actors(x, y, 1, args.range)
+        target = scan_nearest(game_map, x, y, args.range)
+        assert (nearest[0].distance(x, y) if nearest else None) == (target.distance(x, y) if target else None)
+
+    print(f"{args.monsters} monsters on a {args.size}x{args.size} floor, {args.queries} queries")
+    for label, query in (
+        ("radius scan", lambda x, y: scan_in_radius(game_map, x, y, args.radius)),
+        ("radius query", lambda x, y: game_map.get_actors_in_radius(x, y, args.radius)),
+        ("nearest scan", lambda x, y: scan_nearest(game_map, x, y, args.range)),
+        ("nearest query", lambda x, y: game_map.get_nearest_visible_actors(x, y, 1, args.range)),
+    ):
+        start = time.perf_counter()
+        for x, y in positions:
+            query(x, y)
+        elapsed = (time.perf_counter() - start) / args.queries
+        print(f"{label:>14}: {elapsed * 1e6:9.1f} us/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Compare visible and explored layers stored as bool arrays against bit-packed layers.
+
+Run from the project root with `python -m benchmarks.bit_layers`.
+
+A large floor is generated and every floor tile is marked as explored, then the memory used by the layers, the size of
+the saved floor with each compression, and the cost of merging a field of view into `explored` are measured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import tcod
+
+import game.bit_grid
+import game.game_map
+import game.procgen
+import game.serialization
+
+
+def saved_sizes(game_map: game.game_map.GameMap, directory: str) -> str:
+    """Return the size of the saved floor with each compression."""
+    path = os.path.join(directory, "floor.sav")
+    sizes = []
+    for compression in game.serialization.COMPRESSIONS:
+        game.serialization.save_floor(game_map, path, compression=compression)
+        sizes.append(f"{compression} {os.path.getsize(path):>9} B")
+    return ", ".join(sizes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1000, help="Width and height of the map.")
+    parser.add_argument("--radius", type=int, default=8, help="FOV radius.")
+    parser.add_argument("--merges", type=int, default=10000, help="FOV merges to time.")
+    args = parser.parse_args()
+
+    random.seed(0)
+    game_map = game.procgen.generate_dungeon(
+        max_rooms=args.size * args.size // 300,
+        room_min_size=6,
+        room_max_size=10,
+        map_width=args.size,
+        map_height=args.size,
+        current_floor=1,
+        engine=None,
+    )
+    game_map.explored = np.asfortranarray(game_map.tiles["walkable"])
+
+    bools = game_map.explored
+    packed = game.bit_grid.BitGrid.from_bools(bools)
+    print(f"{args.size}x{args.size} map, {int(bools.sum())} explored tiles")
+    print(f"memory per layer: bool {bools.nbytes:>9} B, packed {packed.nbytes:>9} B")
+
+    with tempfile.TemporaryDirectory() as directory:
+        packed_words = game.bit_grid.packed_words
+        game.bit_grid.packed_words = lambda layer: layer[...]  # type: ignore[assignment,return-value]
+        try:
+            print(f"saved as bools:  {saved_sizes(game_map, directory)}")
+        finally:
+            game.bit_grid.packed_words = packed_words
+        print(f"saved as packed: {saved_sizes(game_map, directory)}")
+
+    # Merge fields of view taken at random floor tiles, as `Engine.update_fov` does every turn.
+    floor_x, floor_y = np.nonzero(game_map.tiles["walkable"])
+    picks = np.random.default_rng(0).integers(len(floor_x), size=64)
+    views = []
+    for x, y in zip(floor_x[picks].tolist(), floor_y[picks].tolist()):
+        area = (
+            slice(max(0, x - args.radius), min(args.size, x + args.radius + 1)),
+            slice(max(0, y - args.radius), min(args.size, y + args.radius + 1)),
+        )
+        transparent = game_map.tiles["transparent"][area]
+        views.append((area, tcod.map.compute_fov(transparent, (x - area[0].start, y - area[1].start), args.radius)))
+
+    start = time.perf_counter()
+    for i in range(args.merges):
+        area, visible = views[i % len(views)]
+        bools[area] |= visible
+    bool_time = (time.perf_counter() - start) / args.merges
+    start = time.perf_counter()
+    for i in range(args.merges):
+        area, visible = views[i % len(views)]
+        packed.ior(area, visible)
+    packed_time = (time.perf_counter() - start) / args.merges
+    assert np.array_equal(bools, packed.unpack())
+    print(f"FOV merge into explored: bool {bool_time * 1e6:.2f} us, packed {packed_time * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
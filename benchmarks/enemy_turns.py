@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Compare enemy turns which skip dormant actors against giving every actor on the floor a turn.
+
+Run from the project root with `python -m benchmarks.enemy_turns`.
+
+A large floor is generated and filled with hostile monsters, then the player waits in place while enemy turns are
+timed.  Only the monsters in sight of the player, or still following a path, do anything.  This is measured once with
+monsters anywhere, where monsters in sight also build the shared player flow field each turn, and once with no monster
+near the player.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import game.engine
+import game.entity_factories
+import game.game_map
+import game.procgen
+
+
+class PerformAllEngine(game.engine.Engine):
+    """Gives every actor a turn, as was done before dormant actors were skipped."""
+
+    def handle_enemy_turns(self) -> None:
+        self.turn += 1
+        for entity in self.game_map.actors:
+            if entity is self.player:
+                continue
+            if entity.ai:
+                entity.ai.perform()
+
+
+def time_turns(engine_cls: type[game.engine.Engine], size: int, monsters: int, turns: int, *, clearance: int) -> float:
+    """Return the average seconds per enemy turn on a fresh floor with no monster within `clearance` of the player."""
+    random.seed(0)
+    player = game.entity_factories.spawn(game.entity_factories.player)
+    engine = engine_cls(player=player)
+    engine.game_map = game.procgen.generate_dungeon(
+        max_rooms=size * size // 100,
+        room_min_size=6,
+        room_max_size=10,
+        map_width=size,
+        map_height=size,
+        current_floor=1,
+        engine=engine,
+    )
+    game_map = engine.game_map
+    floor = [
+        (x, y)
+        for x, y in zip(*game_map.tiles["walkable"].nonzero())
+        if not game_map.get_blocking_entity_at(x, y) and max(abs(x - player.x), abs(y - player.y)) > clearance
+    ]
+    for x, y in random.sample(floor, monsters):
+        game.entity_factories.spawn(game.entity_factories.orc).place(int(x), int(y), game_map)
+    engine.update_fov()
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        engine.handle_enemy_turns()
+        engine.update_fov()
+    return (time.perf_counter() - start) / turns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=300, help="Width and height of the floor.")
+    parser.add_argument("--monsters", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{args.monsters} monsters on a {args.size}x{args.size} floor, {args.turns} turns")
+    for clearance in (0, game.engine.Engine.fov_radius):
+        print("monsters anywhere:" if not clearance else "none in sight of the player:")
+        for label, engine_cls in (("every actor", PerformAllEngine), ("skip dormant", game.engine.Engine)):
+            per_turn = time_turns(engine_cls, args.size, args.monsters, args.turns, clearance=clearance)
+            print(f"{label:>16}: {per_turn * 1000:9.3f} ms/turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark enemy turns on a floor crowded with entities.
+
+Run from the project root with `python -m benchmarks.entity_index`.
+
+Every monster is confused so that each one performs a BumpAction per turn, which queries the map for blocking
+entities and actors.  The same floor is measured with the spatial index, with the old linear scans, and with the
+spatial index plus an EntityStore.  Building the player flow field, which gathers every blocking entity, is also timed.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+import argparse
+import copy
+import random
+import time
+
+import game.components.ai
+import game.engine
+import game.entity
+import game.entity_factories
+import game.game_map
+import game.tiles
+
+
+class LinearScanGameMap(game.game_map.GameMap):
+    """A GameMap which answers location queries by scanning every entity, as was done before the spatial index."""
+
+    def get_blocking_entity_at_location(self, location_x: int, location_y: int) -> Optional[game.entity.Entity]:
+        for entity in self.entities:
+            if entity.blocks_movement and entity.x == location_x and entity.y == location_y:
+                return entity
+        return None
+
+    def get_actor_at_location(self, x: int, y: int) -> Optional[game.entity.Actor]:
+        for actor in self.actors:
+            if actor.x == x and actor.y == y:
+                return actor
+        return None
+
+
+class EntityStoreGameMap(game.game_map.GameMap):
+    """A GameMap keeping its entities in an EntityStore."""
+
+    use_entity_store = True
+
+
+def build_floor(map_cls: type[game.game_map.GameMap], monsters: int, items: int, size: int) -> game.engine.Engine:
+    """Return an engine on an open floor populated with confused monsters and scattered items."""
+    random.seed(0)
+    player = copy.deepcopy(game.entity_factories.player)
+    engine = game.engine.Engine(player=player)
+    engine.game_map = map_cls(engine, size, size)
+    engine.game_map.tiles[1:-1, 1:-1] = game.tiles.floor
+    player.place(size // 2, size // 2, engine.game_map)
+
+    free = [(x, y) for x in range(1, size - 1) for y in range(1, size - 1) if (x, y) != (player.x, player.y)]
+    random.shuffle(free)
+    for x, y in free[:monsters]:
+        orc = copy.deepcopy(game.entity_factories.orc)
+        orc.place(x, y, engine.game_map)
+        orc.ai = game.components.ai.ConfusedEnemy(orc, previous_ai=orc.ai, turns_remaining=1_000_000)
+    for x, y in free[monsters : monsters + items]:
+        copy.deepcopy(game.entity_factories.health_potion).place(x, y, engine.game_map)
+    return engine
+
+
+def time_turns(engine: game.engine.Engine, turns: int) -> float:
+    """Return the average seconds spent per enemy turn."""
+    start = time.perf_counter()
+    for _ in range(turns):
+        engine.handle_enemy_turns()
+    return (time.perf_counter() - start) / turns
+
+
+def time_flow_field(engine: game.engine.Engine, repeat: int) -> float:
+    """Return the average seconds spent building the player flow field from scratch."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        engine.game_map._player_flow_field = None
+        engine.game_map.get_player_flow_field()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--monsters", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--size", type=int, default=100, help="Width and height of the floor.")
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.monsters} monsters, {args.items} items on a {args.size}x{args.size} floor, {args.turns} turns")
+    for label, map_cls in (
+        ("linear scan", LinearScanGameMap),
+        ("spatial index", game.game_map.GameMap),
+        ("entity store", EntityStoreGameMap),
+    ):
+        engine = build_floor(map_cls, args.monsters, args.items, args.size)
+        per_turn = time_turns(engine, args.turns)
+        flow_field = time_flow_field(engine, 100)
+        print(f"{label:>14}: {per_turn * 1000:9.2f} ms/turn, {flow_field * 1000:7.3f} ms/flow field")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Measure the memory used by each monster spawned onto a floor.
+
+Run from the project root with `python -m benchmarks.entity_memory`.
+
+Monsters are copied from their prototypes and placed on an open floor the same way procgen does, memory is measured
+with tracemalloc and includes the map's bookkeeping for each entity.
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import gc
+import tracemalloc
+
+import game.entity_factories
+import game.game_map
+import game.tiles
+
+
+def measure(prototype_id: str, count: int) -> float:
+    """Return the bytes allocated per entity when spawning `count` copies of a prototype onto a map."""
+    size = int(count**0.5) + 3
+    game_map = game.game_map.GameMap(None, size, size)
+    game_map.tiles[...] = game.tiles.floor
+    prototype = game.entity_factories.prototypes[prototype_id]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        copy.deepcopy(prototype).place(1 + i % (size - 2), 1 + i // (size - 2), game_map)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10000, help="Entities to spawn of each kind.")
+    args = parser.parse_args()
+
+    for prototype_id in ("orc", "troll", "health_potion", "sword"):
+        print(f"{prototype_id:>14}: {measure(prototype_id, args.count):8.0f} bytes each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Measure dungeon generation on large maps with many room attempts.
+
+Run from the project root with `python -m benchmarks.procgen`.
+
+Generation is timed as it is now, with the old check of each candidate against every accepted room, with the old
+tile by tile digging of tunnels, and with rejected candidates resampled into free space.
+"""
+
+from __future__ import annotations
+
+from typing import Any, List, Tuple, Type
+import argparse
+import random
+import time
+
+from numpy.typing import NDArray
+
+import game.procgen
+
+
+class ScanRoomPlacer(game.procgen.RoomPlacer):
+    """Checks each candidate against every accepted room, as was done before the occupancy grid."""
+
+    def __init__(self, width: int, height: int):
+        super().__init__(width, height)
+        self.rooms: List[game.procgen.RectangularRoom] = []
+
+    def fits(self, room: game.procgen.RectangularRoom) -> bool:
+        return not any(room.intersects(other_room) for other_room in self.rooms)
+
+    def claim(self, room: game.procgen.RectangularRoom) -> None:
+        self.rooms.append(room)
+
+
+class PerTileTunnelCarver(game.procgen.TunnelCarver):
+    """Digs out tunnels one tile at a time, as was done before tunnels were batched."""
+
+    def carve(self, tiles: NDArray[Any], tile: NDArray[Any]) -> None:
+        for x, y in zip(*self.indexes()):
+            tiles[x, y] = tile
+        self._segments.clear()
+        self._paths.clear()
+
+
+def generate(size: int, max_rooms: int, repeat: int, *, resample_rejected: bool = False) -> float:
+    """Return the average seconds spent generating a floor, printing how many rooms it had."""
+    random.seed(0)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        dungeon = game.procgen.generate_dungeon(
+            max_rooms=max_rooms,
+            room_min_size=6,
+            room_max_size=10,
+            map_width=size,
+            map_height=size,
+            current_floor=1,
+            engine=None,
+            resample_rejected=resample_rejected,
+        )
+    elapsed = (time.perf_counter() - start) / repeat
+    floor = int(dungeon.tiles["walkable"].sum())
+    print(f"  {elapsed * 1000:9.1f} ms/floor, {floor} floor tiles, {len(dungeon.entities)} entities")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=500, help="Width and height of the map.")
+    parser.add_argument("--rooms", type=int, default=3000, help="Room attempts per floor.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.rooms} room attempts on a {args.size}x{args.size} map")
+    placer, carver = game.procgen.RoomPlacer, game.procgen.TunnelCarver
+    variants: List[Tuple[str, Type[game.procgen.RoomPlacer], Type[game.procgen.TunnelCarver], bool]] = [
+        ("current:", placer, carver, False),
+        ("scan of accepted rooms:", ScanRoomPlacer, carver, False),
+        ("tunnels dug tile by tile:", placer, PerTileTunnelCarver, False),
+        ("resampling rejected rooms:", placer, carver, True),
+    ]
+    for label, placer_cls, carver_cls, resample_rejected in variants:
+        print(label)
+        game.procgen.RoomPlacer, game.procgen.TunnelCarver = placer_cls, carver_cls  # type: ignore[misc]
+        try:
+            generate(args.size, args.rooms, args.repeat, resample_rejected=resample_rejected)
+        finally:
+            game.procgen.RoomPlacer, game.procgen.TunnelCarver = placer, carver  # type: ignore[misc]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Benchmark drawing a large floor while the player walks around and while nothing changes.
+
+Run from the project root with `python -m benchmarks.render`.
+
+The whole floor is drawn, from scratch and with cached graphics, then only the part inside an 80x43 camera following
+the player, which should cost the same for any floor size.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+import argparse
+import copy
+import random
+import time
+
+import numpy as np
+import tcod
+
+import game.camera
+import game.engine
+import game.entity_factories
+import game.game_map
+import game.procgen
+import game.tiles
+
+
+class FullSelectGameMap(game.game_map.GameMap):
+    """A GameMap which redraws everything from scratch on every frame, as was done before rendering was cached."""
+
+    def render(self, console: tcod.console.Console, camera: Optional[game.camera.Camera] = None) -> None:
+        assert camera is None, "Only draws the whole map."
+        console.rgb[0 : self.width, 0 : self.height] = np.select(
+            condlist=[self.visible[...], self.explored[...]],
+            choicelist=[self.tiles["light"], self.tiles["dark"]],
+            default=game.tiles.SHROUD,
+        )
+        for entity in sorted(self.entities, key=lambda x: x.render_order.value):
+            if self.visible[entity.x, entity.y]:
+                console.print(x=entity.x, y=entity.y, string=entity.char, fg=entity.color)
+        if self.visible[self.downstairs_location]:
+            console.print(x=self.downstairs_location[0], y=self.downstairs_location[1], string=">", fg=(255, 255, 255))
+        if self.has_upstairs and self.visible[self.upstairs_location]:
+            console.print(x=self.upstairs_location[0], y=self.upstairs_location[1], string="<", fg=(255, 255, 255))
+
+
+def build_engine(size: int, seed: int, clutter: int = 0) -> game.engine.Engine:
+    """Return an engine on a generated floor of `size` by `size` tiles, with `clutter` extra corpses and items."""
+    player = copy.deepcopy(game.entity_factories.player)
+    engine = game.engine.Engine(player=player)
+    engine.game_map = game.procgen.generate_detached_dungeon(
+        seed=seed,
+        max_rooms=size * size // 100,
+        room_min_size=6,
+        room_max_size=10,
+        map_width=size,
+        map_height=size,
+        current_floor=1,
+    )
+    engine.game_map.engine = engine
+    player.place(*engine.game_map.upstairs_location, engine.game_map)
+
+    rng = random.Random(seed)
+    floor_x, floor_y = engine.game_map.tiles["walkable"].nonzero()
+    for i in range(clutter):
+        index = rng.randrange(len(floor_x))
+        if i % 2:
+            copy.deepcopy(game.entity_factories.health_potion).place(floor_x[index], floor_y[index], engine.game_map)
+        else:
+            orc = copy.deepcopy(game.entity_factories.orc)
+            orc.place(floor_x[index], floor_y[index], engine.game_map)
+            orc.fighter.die()
+    engine.update_fov()
+    return engine
+
+
+def time_frames(
+    engine: game.engine.Engine, frames: int, walk: bool, seed: int, camera: Optional[game.camera.Camera] = None
+) -> float:
+    """Return the average seconds spent in `GameMap.render`, moving the player a step each frame if `walk` is True.
+
+    If `camera` is given then it follows the player and only its view is drawn.
+    """
+    rng = random.Random(seed)
+    game_map = engine.game_map
+    player = engine.player
+    if camera is None:
+        console = tcod.console.Console(game_map.width, game_map.height, order="F")
+    else:
+        console = tcod.console.Console(camera.width, camera.height, order="F")
+    elapsed = 0.0
+    for _ in range(frames):
+        if walk:
+            dx, dy = rng.choice([(-1, 0), (1, 0), (0, -1), (0, 1)])
+            if game_map.tiles["walkable"][player.x + dx, player.y + dy]:
+                player.move(dx, dy)
+            engine.update_fov()
+        start = time.perf_counter()
+        if camera is not None:
+            camera.center_on(player.x, player.y, game_map.width, game_map.height)
+        game_map.render(console, camera)
+        elapsed += time.perf_counter() - start
+    return elapsed / frames
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=256, help="Width and height of the floor.")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clutter", type=int, default=0, help="Number of corpses and items to scatter on the floor.")
+    args = parser.parse_args()
+
+    print(f"{args.size}x{args.size} floor, {args.clutter} corpses and items, {args.frames} frames")
+    for label, map_cls in (("full select", FullSelectGameMap), ("incremental", game.game_map.GameMap)):
+        for walk in (True, False):
+            engine = build_engine(args.size, args.seed, args.clutter)
+            engine.game_map.__class__ = map_cls
+            per_frame = time_frames(engine, args.frames, walk, args.seed)
+            print(f"{label:>12} {'walking' if walk else 'idle':>8}: {per_frame * 1000:8.3f} ms/frame")
+    for walk in (True, False):
+        engine = build_engine(args.size, args.seed, args.clutter)
+        per_frame = time_frames(engine, args.frames, walk, args.seed, game.camera.Camera(80, 43))
+        print(f"{'camera':>12} {'walking' if walk else 'idle':>8}: {per_frame * 1000:8.3f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
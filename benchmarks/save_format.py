@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Compare the size and speed of the save format with the old pickled saves.
+
+Run from the project root with `python -m benchmarks.save_format`.
+
+A bot plays for a while first so that the save holds several explored floors, monsters and messages.
+"""
+
+from __future__ import annotations
+
+from typing import Callable
+import argparse
+import lzma
+import os
+import pickle
+import tempfile
+import time
+
+import game.headless
+import game.serialization
+import game.setup_game
+
+
+def time_call(func: Callable[[], object], repeat: int) -> float:
+    """Return the best time of `repeat` calls to `func`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=2000, help="Turns the bot plays before saving.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    simulation = game.headless.Simulation(seed=args.seed, min_floor_turns=50)
+    simulation.run(turns=args.turns)
+    engine = simulation.detach_engine()
+    world = engine.game_world
+    print(
+        f"floor {world.current_floor}, {len(world.resident_floors)} resident floors,"
+        f" {sum(len(m.entities) for m in world.resident_floors.values())} entities,"
+        f" {len(engine.message_log.messages)} messages"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "savegame.sav")
+
+        def save_pickle() -> None:
+            with open(path, "wb") as f:
+                f.write(lzma.compress(pickle.dumps(engine)))
+
+        def load_pickle() -> None:
+            with open(path, "rb") as f:
+                pickle.loads(lzma.decompress(f.read()))
+
+        print(f"{'format':>16} {'size':>10} {'save':>10} {'load':>10}")
+        save_time = time_call(save_pickle, args.repeat)
+        load_time = time_call(load_pickle, args.repeat)
+        print(
+            f"{'pickle+lzma':>16} {os.path.getsize(path):>8} B {save_time * 1000:>7.2f} ms {load_time * 1000:>7.2f} ms"
+        )
+
+        for compression in game.serialization.COMPRESSIONS:
+            save_time = time_call(lambda: engine.save_as(path, compression=compression), args.repeat)
+            size = os.path.getsize(path)
+            for mmap in (False, True):
+                load_time = time_call(lambda: game.setup_game.load_game(path, mmap=mmap), args.repeat)
+                label = f"{compression}{'+mmap' if mmap else ''}"
+                print(f"{label:>16} {size:>8} B {save_time * 1000:>7.2f} ms {load_time * 1000:>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
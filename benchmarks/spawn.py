@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Compare spawning entities from templates against copy.deepcopy.
+
+Run from the project root with `python -m benchmarks.spawn`.
+
+Each prototype is copied `--count` times both ways, then whole floors are generated to show the effect on procgen.
+"""
+
+from __future__ import annotations
+
+from typing import Callable
+import argparse
+import copy
+import random
+import time
+
+import game.entity
+import game.entity_factories
+import game.procgen
+
+
+def spawns_per_second(spawn: Callable[[], game.entity.Entity], count: int) -> float:
+    """Return how many entities `spawn` creates per second."""
+    start = time.perf_counter()
+    for _ in range(count):
+        spawn()
+    return count / (time.perf_counter() - start)
+
+
+def generate_floors(floors: int) -> float:
+    """Return the average seconds spent generating a deep, crowded floor."""
+    random.seed(0)
+    start = time.perf_counter()
+    for _ in range(floors):
+        game.procgen.generate_dungeon(
+            max_rooms=30, room_min_size=6, room_max_size=10, map_width=80, map_height=43, current_floor=8, engine=None
+        )
+    return (time.perf_counter() - start) / floors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000, help="Copies to make of each prototype.")
+    parser.add_argument("--floors", type=int, default=200, help="Floors to generate.")
+    args = parser.parse_args()
+
+    print(f"{'prototype':>16} {'deepcopy/s':>12} {'template/s':>12} {'speedup':>8}")
+    for prototype_id, prototype in game.entity_factories.prototypes.items():
+        deepcopied = spawns_per_second(lambda: copy.deepcopy(prototype), args.count)
+        spawned = spawns_per_second(lambda: game.entity_factories.spawn(prototype), args.count)
+        print(f"{prototype_id:>16} {deepcopied:12.0f} {spawned:12.0f} {spawned / deepcopied:7.1f}x")
+
+    with_templates = generate_floors(args.floors)
+    spawn = game.entity_factories.spawn
+    game.entity_factories.spawn = copy.deepcopy  # type: ignore[assignment]
+    try:
+        with_deepcopy = generate_floors(args.floors)
+    finally:
+        game.entity_factories.spawn = spawn
+    print(
+        f"floor generation: {with_deepcopy * 1000:.2f} ms with deepcopy, {with_templates * 1000:.2f} ms with templates"
+    )
+
+
+if __name__ == "__main__":
+    main()
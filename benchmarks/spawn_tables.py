@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Compare choosing what spawns from compiled spawn tables against rebuilding the weights for every room.
+
+Run from the project root with `python -m benchmarks.spawn_tables`.
+
+A synthetic table with `--entries` prototypes spread over 10 floors is sampled for every room of `--rooms` rooms, the
+way procgen did before the tables were compiled and the way it does now.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+import argparse
+import random
+import time
+
+import numpy as np
+
+import game.entity
+import game.entity_factories
+import game.spawn_tables
+
+
+def old_choices(
+    chances_by_floor: Dict[int, List[Tuple[game.entity.Entity, int]]], count: int, floor: int
+) -> List[game.entity.Entity]:
+    """Pick entities as `procgen.get_entities_at_random` did, rebuilding the weights on every call."""
+    weights: Dict[game.entity.Entity, int] = {}
+    for first_floor, chances in chances_by_floor.items():
+        if first_floor > floor:
+            break
+        for entity, weight in chances:
+            weights[entity] = weight
+    return random.choices(list(weights), weights=list(weights.values()), k=count)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000, help="Distinct prototypes in the table.")
+    parser.add_argument("--rooms", type=int, default=1000, help="Rooms per floor.")
+    parser.add_argument("--per-room", type=int, default=3, help="Most entities spawned per room.")
+    parser.add_argument("--floors", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    prototypes = list(game.entity_factories.prototypes.values())
+    chances_by_floor: Dict[int, List[Tuple[game.entity.Entity, int]]] = {floor: [] for floor in range(10)}
+    for index in range(args.entries):
+        entity = game.entity_factories.spawn(prototypes[index % len(prototypes)])  # A distinct key for each entry.
+        chances_by_floor[index % 10].append((entity, random.randint(1, 100)))
+
+    start = time.perf_counter()
+    for floor in range(args.floors):
+        for _ in range(args.rooms):
+            old_choices(chances_by_floor, random.randint(0, args.per_room), floor)
+    old_time = (time.perf_counter() - start) / args.floors
+
+    table = game.spawn_tables.SpawnTable(chances_by_floor, [(0, args.per_room)])
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for floor in range(args.floors):
+        counts = rng.integers(0, table.max_for_floor(floor), size=args.rooms, endpoint=True)
+        table.for_floor(floor).sample(rng, int(counts.sum()))
+    new_time = (time.perf_counter() - start) / args.floors
+
+    print(f"{args.entries} entries, {args.rooms} rooms per floor")
+    print(f"rebuilt per room: {old_time * 1000:8.2f} ms/floor")
+    print(f"  compiled table: {new_time * 1000:8.2f} ms/floor, including compiling")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Measure simulation throughput by letting a bot play without a window.
+
+Run from the project root with `python -m benchmarks.turns_per_second`.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+import argparse
+import os
+import tempfile
+
+import game.autosave
+import game.game_map
+import game.headless
+import game.metrics
+import game.serialization
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=None, help="Stop early after this much wall time.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--render", action="store_true", help="Also render every turn to an offscreen console.")
+    parser.add_argument("--pregenerate", action="store_true", help="Generate the next floor in the background.")
+    parser.add_argument(
+        "--min-floor-turns", type=int, default=0, help="Make the bot spend at least this many turns on each floor."
+    )
+    parser.add_argument("--autosave", type=int, default=None, help="Autosave every this many turns.")
+    parser.add_argument("--compression", default="zlib", choices=game.serialization.COMPRESSIONS)
+    parser.add_argument("--metrics", default=None, help="Write per-phase and per-action timings to this JSON/CSV file.")
+    parser.add_argument("--entity-store", action="store_true", help="Keep entity state in NumPy columns.")
+    args = parser.parse_args()
+    game.metrics.registry.enabled = bool(args.metrics)
+    game.game_map.GameMap.use_entity_store = args.entity_store
+
+    with tempfile.TemporaryDirectory() as directory:
+        autosaver: Optional[game.autosave.Autosaver] = None
+        if args.autosave:
+            autosaver = game.autosave.Autosaver(
+                os.path.join(directory, "autosave.sav"), interval=args.autosave, compression=args.compression
+            )
+        simulation = game.headless.Simulation(
+            render=args.render,
+            seed=args.seed,
+            pregenerate_floors=args.pregenerate,
+            min_floor_turns=args.min_floor_turns,
+            autosaver=autosaver,
+        )
+        simulation.run(turns=args.turns, max_seconds=args.seconds)
+        if autosaver is not None:
+            autosaver.close()
+    for label, value in simulation.report():
+        print(f"{label:>18}: {value}")
+    if args.metrics:
+        game.metrics.registry.dump(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
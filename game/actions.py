@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+import functools
 
 from game.color import descend, enemy_atk, player_atk
-from game.entity import Actor
+from game.entity import Actor, Item
 from game.exceptions import Impossible
+import game.metrics
 
 if TYPE_CHECKING:
     import game.components.inventory
@@ -13,6 +15,21 @@
 
 
 class Action:
+    """Something an entity does.
+
+    The `perform` method of every subclass is timed with `game.metrics` under `metrics_category` and the name of the
+    subclass, including actions performed by other actions such as the `MeleeAction` of a `BumpAction`.
+    """
+
+    __slots__ = ("entity",)
+
+    metrics_category = "action"
+
+    def __init_subclass__(cls) -> None:
+        super().__init_subclass__()
+        if "perform" in cls.__dict__:
+            setattr(cls, "perform", _timed_perform(cls.__dict__["perform"]))
+
     def __init__(self, entity: game.entity.Entity) -> None:
         super().__init__()
         self.entity = entity
@@ -35,6 +52,17 @@ def perform(self) -> None:
         raise NotImplementedError()
 
 
+def _timed_perform(perform: Callable[[Action], None]) -> Callable[[Action], None]:
+    """Wrap an Action `perform` method so that its calls are timed under the name of the actions class."""
+
+    @functools.wraps(perform)
+    def wrapper(self: Action) -> None:
+        with game.metrics.timed(self.metrics_category, type(self).__name__):
+            return perform(self)
+
+    return wrapper
+
+
 class EscapeAction(Action):
     def perform(self) -> None:
         raise SystemExit()
@@ -132,12 +160,12 @@ def perform(self) -> None:
         actor_location_y = self.entity.y
         inventory = self.entity.inventory
 
-        for item in self.engine.game_map.items:
-            if actor_location_x == item.x and actor_location_y == item.y:
+        for item in self.engine.game_map.get_entities_at_location(actor_location_x, actor_location_y):
+            if isinstance(item, Item):
                 if len(inventory.items) >= inventory.capacity:
                     raise Impossible("Your inventory is full.")
 
-                self.engine.game_map.entities.remove(item)
+                self.engine.game_map.remove_entity(item)
                 item.parent = inventory
                 inventory.items.append(item)
 
@@ -180,11 +208,15 @@ def perform(self) -> None:
         """
         Take the stairs, if any exist at the entity's location.
         """
-        if (self.entity.x, self.entity.y) == self.engine.game_map.downstairs_location:
-            self.engine.game_world.generate_floor()
+        game_map = self.engine.game_map
+        if (self.entity.x, self.entity.y) == game_map.downstairs_location:
+            self.engine.game_world.descend()
             self.engine.message_log.add_message("You descend the staircase.", descend)
+        elif game_map.has_upstairs and (self.entity.x, self.entity.y) == game_map.upstairs_location:
+            self.engine.game_world.ascend()
+            self.engine.message_log.add_message("You ascend the staircase.", descend)
         else:
-            raise game.exceptions.Impossible("There are no stairs here.")
+            raise Impossible("There are no stairs here.")
 
 
 class EquipAction(Action):
@@ -0,0 +1,86 @@
+"""Periodic saving which does not hold up the game."""
+
+from __future__ import annotations
+
+from typing import Optional, Set, Tuple
+import concurrent.futures
+import traceback
+
+import game.engine
+import game.game_map
+import game.serialization
+
+
+class Autosaver:
+    """Saves the game every `interval` turns.
+
+    The engine is encoded on the calling thread at a turn boundary, which only copies its data.  Compressing and
+    writing the file happens on a background thread, zlib and lzma release the GIL while they work so the game keeps
+    running.  If the previous save is still being written when the next one is due then it is tried again next turn.
+
+    Once a save is written the floor files which neither it nor the game still refers to are deleted, see
+    `GameWorld.remove_unused_floor_files`.
+    """
+
+    def __init__(self, filename: str, *, interval: int = 50, compression: str = "zlib"):
+        self.filename = filename
+        self.interval = interval
+        self.compression = compression
+        self.saves = 0  # Number of saves written successfully.
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        self._pending: Optional[concurrent.futures.Future[None]] = None
+        self._pending_floor_files: Optional[Tuple[game.game_map.GameWorld, Set[str]]] = None  # Of the pending save.
+        self._engine: Optional[game.engine.Engine] = None
+        self._last_turn = 0
+
+    def is_busy(self) -> bool:
+        """Return True if a save is still being written."""
+        return self._pending is not None and not self._pending.done()
+
+    def _collect(self) -> None:
+        """Report the result of a finished save."""
+        if self._pending is None or not self._pending.done():
+            return
+        try:
+            self._pending.result()
+        except Exception:
+            traceback.print_exc()  # A failed autosave should not end the game, the next one may succeed.
+        else:
+            self.saves += 1
+            if self._pending_floor_files is not None:
+                world, floor_files = self._pending_floor_files
+                world.remove_unused_floor_files(floor_files)
+        self._pending = None
+        self._pending_floor_files = None
+
+    def on_turn(self, engine: game.engine.Engine) -> None:
+        """Start a save of `engine` if one is due, call this between turns."""
+        if engine is not self._engine:  # A new game was started or loaded.
+            self._engine = engine
+            self._last_turn = engine.turn
+        self._collect()
+        if engine.turn - self._last_turn < self.interval or self.is_busy():
+            return
+        self.save(engine)
+
+    def save(self, engine: game.engine.Engine) -> None:
+        """Start saving `engine` now, after any save already in progress."""
+        sections = game.serialization.encode_engine(engine)
+        self.wait()
+        self._engine = engine
+        self._last_turn = engine.turn
+        self._pending_floor_files = engine.game_world, engine.game_world.floor_files()
+        self._pending = self._executor.submit(
+            game.serialization.write_sections, self.filename, sections, self.compression
+        )
+
+    def wait(self) -> None:
+        """Block until the save in progress, if any, is written."""
+        if self._pending is not None:
+            concurrent.futures.wait([self._pending])
+            self._collect()
+
+    def close(self) -> None:
+        """Finish the save in progress and stop the background thread."""
+        self.wait()
+        self._executor.shutdown()
@@ -0,0 +1,109 @@
+"""Boolean map layers packed 8 tiles to a byte."""
+
+from __future__ import annotations
+
+from typing import Any, Optional, Tuple, Union
+
+from numpy.typing import NDArray
+import numpy as np
+
+
+class BitGrid:
+    """A `width` by `height` grid of bools stored one bit per tile.
+
+    Bits are packed along the second axis with `np.packbits`, so `words` has a shape of (`width`, `(height + 7) // 8`)
+    and each byte holds 8 consecutive `y` positions of one column.  The grid can be indexed like the bool array it
+    replaces: an (x, y) pair of ints or of int arrays returns the bits at those positions, an area of slices returns an
+    unpacked copy of that area.  Assigning to an area unpacks and repacks only the bytes the area covers.  The padding
+    bits past `height` in the last byte of each column are unused.
+    """
+
+    def __init__(self, width: int, height: int, words: Optional[NDArray[np.uint8]] = None):
+        self.width, self.height = width, height
+        if words is None:
+            words = np.zeros((width, -(-height // 8)), dtype=np.uint8, order="F")
+        assert words.shape == (width, -(-height // 8)), words.shape
+        self.words: NDArray[np.uint8] = words
+
+    @classmethod
+    def from_bools(cls, bools: NDArray[np.bool_]) -> BitGrid:
+        """Return a packed copy of a bool array."""
+        width, height = bools.shape
+        return cls(width, height, np.asfortranarray(np.packbits(bools, axis=1)))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def nbytes(self) -> int:
+        return self.words.nbytes
+
+    def _area(self, index: Any) -> Tuple[slice, slice]:
+        """Return `index` as a pair of slices with a step of 1 and bounds inside the grid."""
+        if index is Ellipsis:
+            return slice(0, self.width), slice(0, self.height)
+        x, y = index
+        x_start, x_stop, x_step = x.indices(self.width)
+        y_start, y_stop, y_step = y.indices(self.height)
+        assert x_step == 1 and y_step == 1, "Only contiguous areas are supported."
+        return slice(x_start, max(x_start, x_stop)), slice(y_start, max(y_start, y_stop))
+
+    @staticmethod
+    def _word_span(y: slice) -> Tuple[slice, int]:
+        """Return the bytes covering the positions `y` and the offset of `y.start` in the first of those bytes."""
+        first = y.start // 8
+        return slice(first, -(-y.stop // 8)), y.start - first * 8
+
+    def unpack(self, area: Tuple[slice, slice] = (slice(None), slice(None))) -> NDArray[np.bool_]:
+        """Return an area of the grid as a bool array, the whole grid by default."""
+        x, y = self._area(area)
+        words, offset = self._word_span(y)
+        bits = np.unpackbits(self.words[x, words], axis=1)
+        return bits[:, offset : offset + y.stop - y.start].view(np.bool_)
+
+    def ior(self, area: Tuple[slice, slice], bools: NDArray[np.bool_]) -> None:
+        """Set the bits of `area` which are True in `bools`, working on the packed bytes directly."""
+        x, y = self._area(area)
+        words, offset = self._word_span(y)
+        if offset or (y.stop % 8 and y.stop != self.height):
+            # Pad `bools` out to whole bytes, the padding is False and leaves the neighbouring bits unchanged.
+            padded = np.zeros((bools.shape[0], (words.stop - words.start) * 8), dtype=bool)
+            padded[:, offset : offset + bools.shape[1]] = bools
+            bools = padded
+        self.words[x, words] |= np.packbits(bools, axis=1)
+
+    def __getitem__(self, index: Any) -> Any:
+        if index is Ellipsis:
+            return self.unpack()
+        x, y = index
+        if isinstance(x, slice) and isinstance(y, slice):
+            return self.unpack((x, y))
+        if isinstance(x, slice):
+            return self.unpack((x, slice(y, y + 1)))[:, 0]
+        if isinstance(y, slice):
+            return self.unpack((slice(x, x + 1), y))[0]
+        y = np.asarray(y)
+        bits = (self.words[x, y >> 3] >> (7 - (y & 7))) & 1
+        return bits.astype(np.bool_) if bits.ndim else bool(bits)
+
+    def __setitem__(self, index: Any, value: Union[bool, NDArray[np.bool_]]) -> None:
+        x, y = self._area(index)
+        words, offset = self._word_span(y)
+        if np.ndim(value) == 0 and not offset and (y.stop % 8 == 0 or y.stop == self.height):
+            self.words[x, words] = 0xFF if value else 0  # Whole bytes, no need to unpack them.
+            return
+        bits = np.unpackbits(self.words[x, words], axis=1).view(np.bool_)
+        bits[:, offset : offset + y.stop - y.start] = value
+        self.words[x, words] = np.packbits(bits, axis=1)
+
+
+BoolLayer = Union[NDArray[np.bool_], BitGrid]
+"""A map layer of bools, stored either as a bool array or as a `BitGrid`."""
+
+
+def packed_words(layer: BoolLayer) -> NDArray[np.uint8]:
+    """Return a layer as packed bytes in the `BitGrid.words` layout, without copying a `BitGrid`."""
+    if isinstance(layer, BitGrid):
+        return layer.words
+    return np.asfortranarray(np.packbits(layer, axis=1))
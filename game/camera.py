@@ -0,0 +1,51 @@
+"""The view of a map on the screen."""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+
+class Camera:
+    """A window onto a map which is drawn on part of the console.
+
+    The map tile at (`x`, `y`) is drawn at console position (`screen_x`, `screen_y`) and the window is `width` by
+    `height` tiles.  Parts of the window past the edges of the map are left blank.
+    """
+
+    def __init__(self, width: int, height: int, *, screen_x: int = 0, screen_y: int = 0):
+        self.x = 0
+        self.y = 0
+        self.width = width
+        self.height = height
+        self.screen_x = screen_x
+        self.screen_y = screen_y
+
+    def center_on(self, x: int, y: int, map_width: int, map_height: int) -> None:
+        """Move the window to be centered on a map position, without showing more past the map edges than needed."""
+        self.x = max(0, min(x - self.width // 2, map_width - self.width))
+        self.y = max(0, min(y - self.height // 2, map_height - self.height))
+
+    def map_to_screen(self, x: int, y: int) -> Tuple[int, int]:
+        """Return the console position of a map position."""
+        return x - self.x + self.screen_x, y - self.y + self.screen_y
+
+    def screen_to_map(self, x: int, y: int) -> Tuple[int, int]:
+        """Return the map position drawn at a console position."""
+        return x - self.screen_x + self.x, y - self.screen_y + self.y
+
+    def in_view(self, x: int, y: int) -> bool:
+        """Return True if a map position is inside the window."""
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+    def clamp(self, x: int, y: int, map_width: int, map_height: int) -> Tuple[int, int]:
+        """Return the nearest map position to (x, y) which is both on the map and inside the window."""
+        x = max(self.x, 0, min(x, self.x + self.width - 1, map_width - 1))
+        y = max(self.y, 0, min(y, self.y + self.height - 1, map_height - 1))
+        return x, y
+
+    def map_area(self, map_width: int, map_height: int) -> Tuple[slice, slice]:
+        """Return the index of the part of a map inside the window."""
+        return (
+            slice(self.x, max(self.x, min(self.x + self.width, map_width))),
+            slice(self.y, max(self.y, min(self.y + self.height, map_height))),
+        )
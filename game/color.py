@@ -25,4 +25,5 @@
 menu_text = white
 
 red = (0xFF, 0x00, 0x00)
+area_of_effect = (0x80, 0x20, 0x20)
 error = (0xFF, 0x40, 0x40)
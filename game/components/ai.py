@@ -3,7 +3,6 @@
 from typing import TYPE_CHECKING, List, Optional, Tuple
 import random
 
-import numpy as np
 import tcod
 
 from game.actions import Action, BumpAction, MeleeAction, MovementAction
@@ -13,48 +12,52 @@
 
 
 class BaseAI(Action):
+    __slots__ = ()
+
+    metrics_category = "ai"
+
     entity: game.entity.Actor
 
     def perform(self) -> None:
         raise NotImplementedError()
 
-    def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
-        """Compute and return a path to the target position.
+    @property
+    def is_dormant(self) -> bool:
+        """True if `perform` would do nothing while this actor is on a tile the player can not see.
 
-        If there is no valid path then returns an empty list.
+        Dormant actors out of sight are skipped by `Engine.handle_enemy_turns` until they are seen or woken with
+        `GameMap.wake`.  By default an AI is never dormant.
         """
-        # Copy the walkable array.
-        gamemap = self.entity.gamemap
-        assert gamemap is not None
-        cost = np.array(gamemap.tiles["walkable"], dtype=np.int8)
+        return False
 
-        for entity in gamemap.entities:
-            # Check that an entity blocks movement and the cost isn't zero (blocking.)
-            if entity.blocks_movement and cost[entity.x, entity.y]:
-                # Add to the cost of a blocked position.
-                # A lower number means more enemies will crowd behind each other in
-                # hallways.  A higher number means enemies will take longer paths in
-                # order to surround the player.
-                cost[entity.x, entity.y] += 10
+    def get_path_to_player(self) -> List[Tuple[int, int]]:
+        """Return a path to the player by descending the flow field shared by all monsters this turn.
 
-        # Create a graph from the cost array and pass that graph to a new pathfinder.
-        graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
-        pathfinder = tcod.path.Pathfinder(graph)
-
-        pathfinder.add_root((self.entity.x, self.entity.y))  # Start position.
+        If there is no valid path then returns an empty list.
+        """
+        flow_field = self.entity.gamemap.get_player_flow_field()
 
-        # Compute the path to the destination and remove the starting point.
-        path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
+        # Follow the cheapest neighbors down to the player and remove the starting point.
+        path: List[List[int]] = tcod.path.hillclimb2d(
+            flow_field, (self.entity.x, self.entity.y), cardinal=True, diagonal=True
+        )[1:].tolist()
 
         # Convert from List[List[int]] to List[Tuple[int, int]].
         return [(index[0], index[1]) for index in path]
 
 
 class HostileEnemy(BaseAI):
+    __slots__ = ("path",)
+
     def __init__(self, entity: game.entity.Actor):
         super().__init__(entity)
         self.path: List[Tuple[int, int]] = []
 
+    @property
+    def is_dormant(self) -> bool:
+        """Out of sight this AI only follows the rest of a path it started while seen."""
+        return not self.path
+
     def perform(self) -> None:
         target = self.engine.player
         dx = target.x - self.entity.x
@@ -65,7 +68,7 @@ def perform(self) -> None:
             if distance <= 1:
                 return MeleeAction(self.entity, dx, dy).perform()
 
-            self.path = self.get_path_to(target.x, target.y)
+            self.path = self.get_path_to_player()
 
         if self.path:
             dest_x, dest_y = self.path.pop(0)
@@ -82,6 +85,8 @@ class ConfusedEnemy(BaseAI):
     If an actor occupies a tile it is randomly moving into, it will attack.
     """
 
+    __slots__ = ("previous_ai", "turns_remaining")
+
     def __init__(self, entity: game.entity.Actor, previous_ai: Optional[BaseAI], turns_remaining: int):
         super().__init__(entity)
 
@@ -9,6 +9,8 @@
 
 
 class BaseComponent:
+    __slots__ = ("parent",)
+
     parent: game.entity.Entity  # Owning entity instance.
 
     @property
@@ -14,6 +14,8 @@
 
 
 class Consumable(game.components.base_component.BaseComponent):
+    __slots__ = ()
+
     parent: game.entity.Item
 
     def get_action(
@@ -38,6 +40,8 @@ def consume(self) -> None:
 
 
 class HealingConsumable(Consumable):
+    __slots__ = ("amount",)
+
     def __init__(self, amount: int):
         self.amount = amount
 
@@ -58,24 +62,20 @@ def activate(self, action: game.actions.ItemAction) -> None:
 
 
 class LightningDamageConsumable(Consumable):
+    __slots__ = ("damage", "maximum_range")
+
     def __init__(self, damage: int, maximum_range: int):
         self.damage = damage
         self.maximum_range = maximum_range
 
     def activate(self, action: game.actions.ItemAction) -> None:
         consumer = action.entity
-        target = None
-        closest_distance = self.maximum_range + 1.0
-
-        for actor in self.engine.game_map.actors:
-            if actor is not consumer and self.parent.gamemap.visible[actor.x, actor.y]:
-                distance = consumer.distance(actor.x, actor.y)
-
-                if distance < closest_distance:
-                    target = actor
-                    closest_distance = distance
+        # Actors closer than `maximum_range + 1` are in reach, not only those within `maximum_range`.
+        reach = self.maximum_range + 1
+        targets = self.engine.game_map.get_nearest_visible_actors(consumer.x, consumer.y, 1, reach, exclude=consumer)
 
-        if target:
+        if targets and targets[0].distance(consumer.x, consumer.y) < reach:
+            target = targets[0]
             self.engine.message_log.add_message(
                 f"A lighting bolt strikes the {target.name} with a loud thunder, for {self.damage} damage!"
             )
@@ -86,6 +86,8 @@ def activate(self, action: game.actions.ItemAction) -> None:
 
 
 class ConfusionConsumable(Consumable):
+    __slots__ = ("number_of_turns",)
+
     def __init__(self, number_of_turns: int):
         self.number_of_turns = number_of_turns
 
@@ -120,6 +122,8 @@ def activate(self, action: game.actions.ItemAction) -> None:
 
 
 class FireballDamageConsumable(Consumable):
+    __slots__ = ("damage", "radius")
+
     def __init__(self, damage: int, radius: int):
         self.damage = damage
         self.radius = radius
@@ -138,15 +142,14 @@ def activate(self, action: game.actions.ItemAction) -> None:
         if not self.engine.game_map.visible[target_xy]:
             raise game.exceptions.Impossible("You cannot target an area that you cannot see.")
 
-        targets_hit = False
-        for actor in self.engine.game_map.actors:
-            if actor.distance(*target_xy) <= self.radius:
-                self.engine.message_log.add_message(
-                    f"The {actor.name} is engulfed in a fiery explosion, taking {self.damage} damage!"
-                )
-                actor.fighter.take_damage(self.damage)
-                targets_hit = True
+        # The same area as the targeting preview of `AreaRangedAttackHandler`.
+        targets = self.engine.game_map.get_actors_in_radius(*target_xy, self.radius)
+        for actor in targets:
+            self.engine.message_log.add_message(
+                f"The {actor.name} is engulfed in a fiery explosion, taking {self.damage} damage!"
+            )
+            actor.fighter.take_damage(self.damage)
 
-        if not targets_hit:
+        if not targets:
             raise game.exceptions.Impossible("There are no targets in the radius.")
         self.consume()
@@ -10,6 +10,8 @@
 
 
 class Equipment(game.components.base_component.BaseComponent):
+    __slots__ = ("weapon", "armor")
+
     parent: game.entity.Actor
 
     def __init__(self, weapon: Optional[game.entity.Item] = None, armor: Optional[game.entity.Item] = None):
@@ -10,6 +10,8 @@
 
 
 class Equippable(game.components.base_component.BaseComponent):
+    __slots__ = ("equipment_type", "power_bonus", "defense_bonus")
+
     parent: game.entity.Item
 
     def __init__(
@@ -25,20 +27,28 @@ def __init__(
 
 
 class Dagger(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=game.equipment_types.EquipmentType.WEAPON, power_bonus=2)
 
 
 class Sword(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=game.equipment_types.EquipmentType.WEAPON, power_bonus=4)
 
 
 class LeatherArmor(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=game.equipment_types.EquipmentType.ARMOR, defense_bonus=1)
 
 
 class ChainMail(Equippable):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(equipment_type=game.equipment_types.EquipmentType.ARMOR, defense_bonus=3)
@@ -12,24 +12,81 @@
 
 
 class Fighter(BaseComponent):
+    __slots__ = ("_max_hp", "_hp", "_base_defense", "_base_power")
+
     parent: game.entity.Actor
 
+    # While the parent is in an `EntityStore` these stats live in its row and the slots above are out of date.
+
     def __init__(self, hp: int, base_defense: int, base_power: int):
-        self.max_hp = hp
+        self._max_hp = hp
         self._hp = hp
-        self.base_defense = base_defense
-        self.base_power = base_power
+        self._base_defense = base_defense
+        self._base_power = base_power
 
     @property
     def hp(self) -> int:
-        return self._hp
+        store = self.parent.store
+        if store is None:
+            return self._hp
+        return int(store.hp[self.parent.store_id])
 
     @hp.setter
     def hp(self, value: int) -> None:
-        self._hp = max(0, min(value, self.max_hp))
-        if self._hp == 0 and self.parent.ai:
+        hp = max(0, min(value, self.max_hp))
+        store = self.parent.store
+        if store is None:
+            self._hp = hp
+        else:
+            store.hp[self.parent.store_id] = hp
+        if hp == 0 and self.parent.ai:
             self.die()
 
+    @property
+    def max_hp(self) -> int:
+        store = self.parent.store
+        if store is None:
+            return self._max_hp
+        return int(store.max_hp[self.parent.store_id])
+
+    @max_hp.setter
+    def max_hp(self, value: int) -> None:
+        store = self.parent.store
+        if store is None:
+            self._max_hp = value
+        else:
+            store.max_hp[self.parent.store_id] = value
+
+    @property
+    def base_defense(self) -> int:
+        store = self.parent.store
+        if store is None:
+            return self._base_defense
+        return int(store.defense[self.parent.store_id])
+
+    @base_defense.setter
+    def base_defense(self, value: int) -> None:
+        store = self.parent.store
+        if store is None:
+            self._base_defense = value
+        else:
+            store.defense[self.parent.store_id] = value
+
+    @property
+    def base_power(self) -> int:
+        store = self.parent.store
+        if store is None:
+            return self._base_power
+        return int(store.power[self.parent.store_id])
+
+    @base_power.setter
+    def base_power(self, value: int) -> None:
+        store = self.parent.store
+        if store is None:
+            self._base_power = value
+        else:
+            store.power[self.parent.store_id] = value
+
     @property
     def defense(self) -> int:
         return self.base_defense + self.defense_bonus
@@ -68,6 +125,7 @@ def die(self) -> None:
         self.parent.ai = None
         self.parent.name = f"remains of {self.parent.name}"
         self.parent.render_order = RenderOrder.CORPSE
+        self.parent.gamemap.update_entity_graphics(self.parent)
 
         self.engine.message_log.add_message(death_message, death_message_color)
 
@@ -90,3 +148,5 @@ def heal(self, amount: int) -> int:
 
     def take_damage(self, amount: int) -> None:
         self.hp -= amount
+        if self.parent.is_alive and self.parent is not self.engine.player:
+            self.gamemap.wake(self.parent)  # Let it react even if it was hurt out of sight.
@@ -10,6 +10,8 @@
 
 
 class Inventory(BaseComponent):
+    __slots__ = ("capacity", "items")
+
     parent: game.entity.Actor
 
     def __init__(self, capacity: int):
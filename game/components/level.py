@@ -5,6 +5,8 @@
 
 
 class Level(BaseComponent):
+    __slots__ = ("current_level", "current_xp", "level_up_base", "level_up_factor", "xp_given")
+
     parent: game.entity.Actor
 
     def __init__(
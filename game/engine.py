@@ -1,15 +1,22 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
-import lzma
-import pickle
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Tuple
+import collections
 
+from numpy.typing import NDArray
+import numpy as np
 import tcod
 
+import game.bit_grid
+import game.camera
 import game.color
 import game.entity
 import game.message_log
+import game.metrics
 import game.render_functions
+import game.scheduler
+import game.serialization
+import game.stencils
 
 if TYPE_CHECKING:
     import game.game_map
@@ -19,56 +26,192 @@ class Engine:
     game_map: game.game_map.GameMap
     game_world: game.game_map.GameWorld
 
+    fov_radius = 8
+    fov_cache_size = 64  # Maximum number of FOV results remembered for the current map.
+
+    # Size of the map view, the rest of the 80x50 screen is used for the message log and status.
+    view_width = 80
+    view_height = 43
+
     def __init__(self, player: game.entity.Actor):
         self.player = player
-        self.mouse_location = (0, 0)
+        self.mouse_location = (0, 0)  # Map position under the mouse or the targeting cursor.
+        self.camera = game.camera.Camera(self.view_width, self.view_height)
         self.message_log = game.message_log.MessageLog()
+        self.turn = 0  # Number of enemy turns handled so far.
+        self.time = 0  # Game time, advanced by each action of the player, see `game.scheduler`.
+        self._reset_fov_cache()
+        self._reset_scheduler()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return the state to be pickled, the FOV cache and the turn queue are not saved.
+
+        Games are saved with `game.serialization`, pickling is only kept so that `benchmarks.save_format` can compare
+        against the pickled saves of older versions.
+        """
+        state = self.__dict__.copy()
+        for key in ("fov_cache", "_fov_cache_map", "_fov_area", "fov_cache_hits", "fov_cache_misses"):
+            del state[key]
+        del state["scheduler"], state["_scheduler_map"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._reset_fov_cache()
+        self._reset_scheduler()
+        if "game_map" in state:
+            self.game_map.engine = self  # Maps are pickled without their engine.
+
+    def _reset_fov_cache(self) -> None:
+        """Clear the FOV cache and its counters."""
+        # FOV results keyed by (x, y, radius, transparency_version), least recently used first.  Each result only covers
+        # the area of the map within the radius, see `_fov_area_of`.
+        self.fov_cache: collections.OrderedDict[Tuple[int, int, int, int], NDArray[np.bool_]] = (
+            collections.OrderedDict()
+        )
+        self._fov_cache_map: Optional[game.game_map.GameMap] = None  # The map the cached results belong to.
+        self._fov_area: Optional[Tuple[slice, slice]] = None  # Where `visible` was last set on `_fov_cache_map`.
+        self.fov_cache_hits = 0
+        self.fov_cache_misses = 0
+
+    def _reset_scheduler(self) -> None:
+        """Empty the turn queue, active actors join it again on the next enemy turn."""
+        self.scheduler = game.scheduler.TurnScheduler()
+        self._scheduler_map: Optional[game.game_map.GameMap] = None  # The map the queued actors are on.
+
+    def _fov_area_of(self, x: int, y: int) -> Tuple[slice, slice]:
+        """Return the area of the current map which can be seen from (x, y)."""
+        radius = self.fov_radius
+        if radius <= 0:  # Unlimited.
+            return slice(0, self.game_map.width), slice(0, self.game_map.height)
+        return (
+            slice(max(0, x - radius), min(self.game_map.width, x + radius + 1)),
+            slice(max(0, y - radius), min(self.game_map.height, y + radius + 1)),
+        )
 
     def update_fov(self) -> None:
-        """Recompute the visible area based on the players point of view."""
-        self.game_map.visible[:] = tcod.map.compute_fov(
-            self.game_map.tiles["transparent"],
-            (self.player.x, self.player.y),
-            radius=8,
-        )
+        """Recompute the visible area based on the players point of view.
+
+        Results are cached, so waiting in place or walking back over known ground skips `compute_fov`.  Only the area
+        within `fov_radius` of the player is computed and updated, so the cost does not depend on the size of the map.
+        """
+        if self._fov_cache_map is not self.game_map:
+            self.fov_cache.clear()
+            self._fov_cache_map = self.game_map
+            self.game_map.visible[...] = False
+            self._fov_area = None
+
+        x, y = self.player.x, self.player.y
+        area = self._fov_area_of(x, y)
+        key = x, y, self.fov_radius, self.game_map.transparency_version
+        visible = self.fov_cache.get(key)
+        if visible is not None:
+            self.fov_cache.move_to_end(key)
+            self.fov_cache_hits += 1
+        else:
+            visible = tcod.map.compute_fov(
+                self.game_map.tiles["transparent"][area],
+                (x - area[0].start, y - area[1].start),
+                radius=self.fov_radius,
+            )
+            visible.flags.writeable = False
+            self.fov_cache[key] = visible
+            if len(self.fov_cache) > self.fov_cache_size:
+                self.fov_cache.popitem(last=False)
+            self.fov_cache_misses += 1
+
+        if self._fov_area is not None:
+            self.game_map.visible[self._fov_area] = False
+        self.game_map.visible[area] = visible
+        self._fov_area = area
         # If a tile is "visible" it should be added to "explored".
-        self.game_map.explored |= self.game_map.visible
+        explored = self.game_map.explored
+        if isinstance(explored, game.bit_grid.BitGrid):
+            explored.ior(area, visible)  # Merged into the packed bytes without unpacking them.
+        else:
+            explored[area] |= visible
 
     def handle_enemy_turns(self) -> None:
-        for entity in self.game_map.actors:
-            if entity is self.player:
+        """Let the monsters act until they catch up with the action the player just took.
+
+        The players action advances `time` by `game.scheduler.action_time` of the players speed.  Monsters act when
+        they are due in `scheduler`, and each action queues the next one after the action time of the monsters own
+        speed.  At the same speed as the player a monster acts once per turn, faster monsters act more often.
+
+        Only monsters which could do something are queued.  Actors on tiles the player can see and the `awake_actors`
+        of the map join the queue, nearest to the player first.  An actor with a dormant AI (see `BaseAI.is_dormant`)
+        leaves the queue once it is out of sight.  Monsters which are far away, or queued far ahead, cost nothing.
+        """
+        self.turn += 1
+        game_map = self.game_map
+        if self._scheduler_map is not game_map:
+            self._reset_scheduler()
+            self._scheduler_map = game_map
+        scheduler = self.scheduler
+        self.time += game.scheduler.action_time(self.player.speed)
+
+        if self._fov_cache_map is game_map and self._fov_area is not None:
+            nearby: Iterable[game.entity.Actor] = game_map.get_actors_in_area(self._fov_area)
+        else:
+            nearby = game_map.actors
+        joining = {actor for actor in nearby if game_map.visible[actor.x, actor.y] and actor not in scheduler}
+        joining.update(actor for actor in game_map.awake_actors if actor not in scheduler)
+        joining.discard(self.player)
+        player_x, player_y = self.player.x, self.player.y
+        for actor in sorted(
+            joining, key=lambda actor: game.stencils.nearest_first(player_x, player_y, (actor.x, actor.y))
+        ):
+            scheduler.schedule(actor, self.time)
+
+        for due_time, entity in scheduler.pop_due(self.time):
+            if entity.parent is not game_map or not entity.is_alive or entity.ai is None:
+                game_map.awake_actors.discard(entity)
                 continue
-            if entity.ai:
-                entity.ai.perform()
+            # Woken actors are still in `awake_actors` and get this turn even if they are dormant.
+            if entity in game_map.awake_actors or not entity.ai.is_dormant or game_map.visible[entity.x, entity.y]:
+                entity.ai.perform()  # Timed as "ai.<class name>", see `Action`.
+            if entity.is_alive and entity.ai and not entity.ai.is_dormant:
+                game_map.awake_actors.add(entity)
+            else:
+                game_map.awake_actors.discard(entity)
+                if not (entity.is_alive and game_map.visible[entity.x, entity.y]):
+                    continue  # Dormant until it is seen or woken again.
+            scheduler.schedule(entity, due_time + game.scheduler.action_time(entity.speed))
 
     def render(self, console: tcod.console.Console) -> None:
-        self.game_map.render(console)
-
-        self.message_log.render(console=console, x=21, y=45, width=40, height=5)
-
-        game.render_functions.render_bar(
-            console=console,
-            current_value=self.player.fighter.hp,
-            maximum_value=self.player.fighter.max_hp,
-            total_width=20,
-        )
-
-        game.render_functions.render_dungeon_level(
-            console=console,
-            dungeon_level=self.game_world.current_floor,
-            location=(0, 47),
-        )
-
-        console.print(
-            x=0,
-            y=46,
-            string=f"LVL: {self.player.level.current_level}",
-        )
-
-        game.render_functions.render_names_at_mouse_location(console=console, x=21, y=44, engine=self)
-
-    def save_as(self, filename: str) -> None:
-        """Save this Engine instance as a compressed file."""
-        save_data = lzma.compress(pickle.dumps(self))
-        with open(filename, "wb") as f:
-            f.write(save_data)
+        with game.metrics.timed("render.map"):
+            self.camera.center_on(self.player.x, self.player.y, self.game_map.width, self.game_map.height)
+            self.game_map.render(console, self.camera)
+
+        with game.metrics.timed("render.log"):
+            self.message_log.render(console=console, x=21, y=45, width=40, height=5)
+
+        with game.metrics.timed("render.bars"):
+            game.render_functions.render_bar(
+                console=console,
+                current_value=self.player.fighter.hp,
+                maximum_value=self.player.fighter.max_hp,
+                total_width=20,
+            )
+
+            game.render_functions.render_dungeon_level(
+                console=console,
+                dungeon_level=self.game_world.current_floor,
+                location=(0, 47),
+            )
+
+            console.print(
+                x=0,
+                y=46,
+                string=f"LVL: {self.player.level.current_level}",
+            )
+
+        with game.metrics.timed("render.tooltip"):
+            game.render_functions.render_names_at_mouse_location(console=console, x=21, y=44, engine=self)
+
+    def save_as(self, filename: str, *, compression: str = "zlib") -> None:
+        """Save this Engine instance as a compressed file.
+
+        See `game.serialization.COMPRESSIONS` for the supported `compression` values.
+        """
+        game.serialization.save_engine(self, filename, compression=compression)
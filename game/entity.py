@@ -13,6 +13,7 @@
     import game.components.fighter
     import game.components.inventory
     import game.components.level
+    import game.entity_store
     import game.game_map
 
 
@@ -21,6 +22,20 @@ class Entity:
     A generic object to represent players, enemies, items, etc.
     """
 
+    __slots__ = (
+        "parent",
+        "_x",
+        "_y",
+        "char",
+        "color",
+        "name",
+        "_blocks_movement",
+        "render_order",
+        "prototype_id",
+        "store",
+        "store_id",
+    )
+
     parent: Union[GameMap, game.components.inventory.Inventory]
 
     def __init__(
@@ -33,6 +48,8 @@ def __init__(
         name: str = "<Unnamed>",
         blocks_movement: bool = False,
     ):
+        self.store: Optional[game.entity_store.EntityStore] = None  # Set while `x`, `y`, etc. live in a store.
+        self.store_id = -1  # The row of this entity in `store`.
         self.x = x
         self.y = y
         self.char = char
@@ -40,11 +57,51 @@ def __init__(
         self.name = name
         self.blocks_movement = blocks_movement
         self.render_order = RenderOrder.CORPSE
+        self.prototype_id: Optional[str] = None  # Key in `game.entity_factories.prototypes` this was copied from.
         if parent:
             # If parent isn't provided now then it will be set later.
             self.parent = parent
-            if hasattr(parent, "entities"):
-                parent.entities.add(self)
+            if isinstance(parent, GameMap):
+                parent.add_entity(self)
+
+    @property
+    def x(self) -> int:
+        if self.store is None:
+            return self._x
+        return int(self.store.x[self.store_id])
+
+    @x.setter
+    def x(self, value: int) -> None:
+        if self.store is None:
+            self._x = value
+        else:
+            self.store.x[self.store_id] = value
+
+    @property
+    def y(self) -> int:
+        if self.store is None:
+            return self._y
+        return int(self.store.y[self.store_id])
+
+    @y.setter
+    def y(self, value: int) -> None:
+        if self.store is None:
+            self._y = value
+        else:
+            self.store.y[self.store_id] = value
+
+    @property
+    def blocks_movement(self) -> bool:
+        if self.store is None:
+            return self._blocks_movement
+        return bool(self.store.blocks_movement[self.store_id])
+
+    @blocks_movement.setter
+    def blocks_movement(self, value: bool) -> None:
+        if self.store is None:
+            self._blocks_movement = value
+        else:
+            self.store.blocks_movement[self.store_id] = value
 
     @property
     def gamemap(self) -> GameMap:
@@ -55,19 +112,23 @@ def gamemap(self) -> GameMap:
 
     def place(self, x: int, y: int, gamemap: Optional[GameMap] = None) -> None:
         """Place this entity at a new location. Handles moving across GameMaps."""
-        self.x = x
-        self.y = y
         if gamemap:
             if hasattr(self, "parent"):  # Possibly uninitialized.
-                if hasattr(self.parent, "entities"):
-                    self.parent.entities.remove(self)
+                if isinstance(self.parent, GameMap):
+                    self.parent.remove_entity(self)
+            self.x = x
+            self.y = y
             self.parent = gamemap
-            gamemap.entities.add(self)
+            gamemap.add_entity(self)
+        elif hasattr(self, "parent") and isinstance(self.parent, GameMap):
+            self.parent.move_entity(self, x, y)
+        else:
+            self.x = x
+            self.y = y
 
     def move(self, dx: int, dy: int) -> None:
         # Move the entity by a given amount
-        self.x += dx
-        self.y += dy
+        self.place(self.x + dx, self.y + dy)
 
     def distance(self, x: int, y: int) -> float:
         """
@@ -77,6 +138,8 @@ def distance(self, x: int, y: int) -> float:
 
 
 class Actor(Entity):
+    __slots__ = ("ai", "equipment", "fighter", "inventory", "level", "speed")
+
     def __init__(
         self,
         *,
@@ -90,6 +153,7 @@ def __init__(
         fighter: game.components.fighter.Fighter,
         inventory: game.components.inventory.Inventory,
         level: game.components.level.Level,
+        speed: int = 100,
     ):
         super().__init__(
             parent=None,
@@ -115,6 +179,8 @@ def __init__(
         self.level = level
         self.level.parent = self
 
+        self.speed = speed  # How often this actor acts, 100 is once per turn, see `game.scheduler`.
+
         self.render_order = RenderOrder.ACTOR
 
     @property
@@ -124,6 +190,8 @@ def is_alive(self) -> bool:
 
 
 class Item(Entity):
+    __slots__ = ("consumable", "equippable")
+
     def __init__(
         self,
         *,
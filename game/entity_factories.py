@@ -1,3 +1,5 @@
+from typing import Any, Dict, TypeVar
+
 from game.components.ai import HostileEnemy
 from game.components.consumable import (
     ConfusionConsumable,
@@ -10,7 +12,10 @@
 from game.components.fighter import Fighter
 from game.components.inventory import Inventory
 from game.components.level import Level
-from game.entity import Actor, Item
+from game.entity import Actor, Entity, Item
+from game.templates import Template
+
+T = TypeVar("T", bound=Entity)
 
 player = Actor(
     char="@",
@@ -100,3 +105,34 @@
     name="Chain Mail",
     equippable=ChainMail(),
 )
+
+prototypes: Dict[str, Entity] = {
+    "player": player,
+    "orc": orc,
+    "troll": troll,
+    "health_potion": health_potion,
+    "lightning_scroll": lightning_scroll,
+    "confusion_scroll": confusion_scroll,
+    "fireball_scroll": fireball_scroll,
+    "dagger": dagger,
+    "sword": sword,
+    "leather_armor": leather_armor,
+    "chain_mail": chain_mail,
+}
+"""Every entity prototype by a stable id, save files refer to prototypes by these ids."""
+
+for prototype_id, prototype in prototypes.items():
+    prototype.prototype_id = prototype_id
+
+templates: Dict[str, Template[Any]] = {}
+"""Compiled templates of `prototypes` by id, filled in by `spawn` as each prototype is first used."""
+
+
+def spawn(prototype: T) -> T:
+    """Return a new copy of a prototype from `prototypes`, the same as `copy.deepcopy(prototype)` but much faster."""
+    assert prototype.prototype_id is not None, f"{prototype.name} is not in `prototypes`."
+    template = templates.get(prototype.prototype_id)
+    if template is None:
+        template = templates[prototype.prototype_id] = Template(prototype)
+    spawned: T = template.spawn()
+    return spawned
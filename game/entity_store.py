@@ -0,0 +1,120 @@
+"""Struct-of-arrays storage for the entities of a map."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, List, Optional
+
+from numpy.typing import NDArray
+import numpy as np
+
+if TYPE_CHECKING:
+    import game.entity
+
+
+class EntityStore:
+    """Entity state held in NumPy columns, one row per entity.
+
+    While an entity is in a store its `x`, `y` and `blocks_movement`, and the `hp`, `max_hp`, `base_defense` and
+    `base_power` of its fighter, are read from and written to its row, so the columns can be queried and updated in
+    bulk.  The graphics columns `char`, `fg` and `render_order` are copies which `GameMap.update_entity_graphics` keeps
+    current.  Rows are stable for as long as an entity stays in the store and are reused once it leaves.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.entities: List[Optional[game.entity.Entity]] = [None] * capacity  # The entity of each row.
+        self._free_rows = list(range(capacity - 1, -1, -1))
+        self.in_use = np.zeros(capacity, dtype=bool)
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.blocks_movement = np.zeros(capacity, dtype=bool)
+        self.is_actor = np.zeros(capacity, dtype=bool)  # True if the row has the fighter columns below.
+        self.hp = np.zeros(capacity, dtype=np.int32)
+        self.max_hp = np.zeros(capacity, dtype=np.int32)
+        self.defense = np.zeros(capacity, dtype=np.int32)  # Base defense, without equipment.
+        self.power = np.zeros(capacity, dtype=np.int32)  # Base power, without equipment.
+        self.char = np.zeros(capacity, dtype=np.int32)
+        self.fg = np.zeros((capacity, 3), dtype=np.uint8)
+        self.render_order = np.zeros(capacity, dtype=np.uint8)
+
+    COLUMNS = (
+        "in_use",
+        "x",
+        "y",
+        "blocks_movement",
+        "is_actor",
+        "hp",
+        "max_hp",
+        "defense",
+        "power",
+        "char",
+        "fg",
+        "render_order",
+    )
+
+    def __len__(self) -> int:
+        return len(self.entities) - len(self._free_rows)
+
+    def _grow(self) -> None:
+        """Double the number of rows."""
+        capacity = len(self.entities)
+        for name in self.COLUMNS:
+            column: NDArray[Any] = getattr(self, name)
+            grown = np.zeros((capacity * 2,) + column.shape[1:], dtype=column.dtype)
+            grown[:capacity] = column
+            setattr(self, name, grown)
+        self.entities.extend([None] * capacity)
+        self._free_rows.extend(range(capacity * 2 - 1, capacity - 1, -1))
+
+    def add(self, entity: game.entity.Entity) -> None:
+        """Give an entity a row, after which its stored attributes live in this store."""
+        import game.entity
+
+        assert entity.store is None, "Entity is already in a store."
+        if not self._free_rows:
+            self._grow()
+        row = self._free_rows.pop()
+        self.entities[row] = entity
+        self.in_use[row] = True
+        self.x[row] = entity.x
+        self.y[row] = entity.y
+        self.blocks_movement[row] = entity.blocks_movement
+        self.is_actor[row] = isinstance(entity, game.entity.Actor)
+        if isinstance(entity, game.entity.Actor):
+            fighter = entity.fighter
+            self.hp[row] = fighter.hp
+            self.max_hp[row] = fighter.max_hp
+            self.defense[row] = fighter.base_defense
+            self.power[row] = fighter.base_power
+        self.update_graphics(entity, row)
+        entity.store = self
+        entity.store_id = row
+
+    def remove(self, entity: game.entity.Entity) -> None:
+        """Free the row of an entity, copying its stored attributes back onto the entity."""
+        import game.entity
+
+        assert entity.store is self, "Entity is not in this store."
+        row = entity.store_id
+        x, y, blocks_movement = entity.x, entity.y, entity.blocks_movement
+        if isinstance(entity, game.entity.Actor):
+            fighter = entity.fighter
+            hp, max_hp, base_defense, base_power = fighter.hp, fighter.max_hp, fighter.base_defense, fighter.base_power
+        entity.store = None
+        entity.store_id = -1
+        entity.x, entity.y, entity.blocks_movement = x, y, blocks_movement
+        if isinstance(entity, game.entity.Actor):
+            fighter._hp, fighter.max_hp, fighter.base_defense, fighter.base_power = hp, max_hp, base_defense, base_power
+        self.entities[row] = None
+        self.in_use[row] = False
+        self._free_rows.append(row)
+
+    def update_graphics(self, entity: game.entity.Entity, row: int) -> None:
+        """Copy the graphics of an entity into its row."""
+        self.char[row] = ord(entity.char)
+        self.fg[row] = entity.color
+        self.render_order[row] = entity.render_order.value
+
+    def blocking_positions(self) -> Any:
+        """Return the (x, y) index arrays of every entity which blocks movement, usable to index a map array."""
+        rows = (self.in_use & self.blocks_movement).nonzero()[0]
+        return self.x[rows], self.y[rows]
@@ -0,0 +1,97 @@
+"""Helpers for the main loop: dropping redundant events, deciding when to redraw and timing frames."""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Tuple
+
+import tcod
+
+import game.metrics
+
+
+def coalesce_events(events: Iterable[tcod.event.Event]) -> List[tcod.event.Event]:
+    """Return `events` with redundant events of a burst removed.
+
+    Of consecutive mouse motions only the last is kept, since only the final position matters.  A key repeat which
+    repeats the key repeat right before it is dropped, so that holding a key while the game is busy does not queue up
+    moves which would keep going after the key is released.
+    """
+    coalesced: List[tcod.event.Event] = []
+    for event in events:
+        if coalesced:
+            previous = coalesced[-1]
+            if isinstance(event, tcod.event.MouseMotion) and isinstance(previous, tcod.event.MouseMotion):
+                coalesced[-1] = event
+                continue
+            if (
+                isinstance(event, tcod.event.KeyDown)
+                and event.repeat
+                and isinstance(previous, tcod.event.KeyDown)
+                and previous.repeat
+                and (event.sym, event.mod) == (previous.sym, previous.mod)
+            ):
+                continue
+        coalesced.append(event)
+    return coalesced
+
+
+class RedrawTracker:
+    """Decides which events can change what is on screen.
+
+    Mouse motion only matters when the mouse moves onto a different tile, key releases are not used by any handler.
+    """
+
+    def __init__(self) -> None:
+        self.mouse_tile: Optional[Tuple[int, int]] = None
+
+    def needs_redraw(self, event: tcod.event.Event) -> bool:
+        """Return True if the screen may need to be drawn again after `event`, which must be converted to tiles."""
+        if isinstance(event, tcod.event.MouseMotion):
+            tile = int(event.position.x), int(event.position.y)
+            if tile == self.mouse_tile:
+                return False
+            self.mouse_tile = tile
+            return True
+        return not isinstance(event, tcod.event.KeyUp)
+
+
+class FrameStats:
+    """Accumulates how long frames take to render and present, and how long event handling takes.
+
+    The same timings are recorded in `game.metrics.registry` as "frame.render", "frame.present" and "frame.events".
+    """
+
+    def __init__(self) -> None:
+        self.frames = 0
+        self.render_seconds = 0.0
+        self.present_seconds = 0.0
+        self.event_seconds = 0.0
+        self.events = 0
+        self.events_dropped = 0  # Events removed by `coalesce_events`.
+        self.slowest_frame = 0.0  # Longest render plus present time.
+
+    def add_frame(self, render_seconds: float, present_seconds: float) -> None:
+        """Record a drawn frame."""
+        self.frames += 1
+        self.render_seconds += render_seconds
+        self.present_seconds += present_seconds
+        self.slowest_frame = max(self.slowest_frame, render_seconds + present_seconds)
+        game.metrics.registry.record("frame.render", render_seconds)
+        game.metrics.registry.record("frame.present", present_seconds)
+
+    def add_events(self, seconds: float, handled: int, dropped: int) -> None:
+        """Record a batch of handled events."""
+        self.event_seconds += seconds
+        self.events += handled
+        self.events_dropped += dropped
+        game.metrics.registry.record("frame.events", seconds)
+
+    def summary(self) -> str:
+        """Return a single line describing the recorded timings."""
+        frames = self.frames or 1
+        events = self.events or 1
+        return (
+            f"{self.frames} frames, render {self.render_seconds / frames * 1000:.2f} ms,"
+            f" present {self.present_seconds / frames * 1000:.2f} ms, slowest {self.slowest_frame * 1000:.2f} ms;"
+            f" {self.events} events ({self.events_dropped} coalesced), {self.event_seconds / events * 1000:.2f} ms each"
+        )
@@ -1,10 +1,28 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Set
-
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import collections
+import concurrent.futures
+import concurrent.futures.process
+import functools
+import itertools
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import traceback
+import uuid
+
+from numpy.typing import NDArray
 import numpy as np
 import tcod
 
+import game.bit_grid
+import game.camera
+import game.entity_store
+import game.render_order
+import game.stencils
 import game.tiles
 
 if TYPE_CHECKING:
@@ -12,19 +30,189 @@
     import game.entity
 
 
+_floor_executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+CHUNK_SIZE = 32
+"""Width and height of the chunks composed map graphics are kept in, see `GameMap.compose_graphics`."""
+
+
+def get_floor_executor() -> concurrent.futures.ProcessPoolExecutor:
+    """Return the worker process used to generate floors ahead of time, starting it if needed."""
+    global _floor_executor
+    if _floor_executor is None:
+        # Spawn a fresh interpreter instead of forking one which may own a window and other threads.
+        _floor_executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _floor_executor
+
+
+def discard_floor_executor() -> None:
+    """Shut down the floor generation worker, a new one is started on the next call to `get_floor_executor`.
+
+    This does not wait for the worker, callers should cancel any floor they are still waiting on.
+    """
+    global _floor_executor
+    if _floor_executor is not None:
+        _floor_executor.shutdown(wait=False)
+        _floor_executor = None
+
+
+class RenderLayer:
+    """The entities drawn at one `RenderOrder`.
+
+    Positions and graphics are kept in arrays parallel to `entities` so that the whole layer can be drawn with a few
+    vectorized writes.  Removing an entity moves the last entity into its slot.
+    """
+
+    def __init__(self) -> None:
+        self.entities: List[game.entity.Entity] = []
+        self._slots: Dict[game.entity.Entity, int] = {}
+        self.x = np.zeros(8, dtype=np.intp)
+        self.y = np.zeros(8, dtype=np.intp)
+        self.ch = np.zeros(8, dtype=np.int32)
+        self.fg = np.zeros((8, 3), dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def add(self, entity: game.entity.Entity) -> None:
+        """Add an entity to this layer."""
+        slot = len(self.entities)
+        if slot == len(self.x):
+            capacity = slot * 2
+            self.x = np.resize(self.x, capacity)
+            self.y = np.resize(self.y, capacity)
+            self.ch = np.resize(self.ch, capacity)
+            self.fg = np.resize(self.fg, (capacity, 3))
+        self.entities.append(entity)
+        self._slots[entity] = slot
+        self.update(entity)
+
+    def remove(self, entity: game.entity.Entity) -> None:
+        """Remove an entity from this layer."""
+        slot = self._slots.pop(entity)
+        last = self.entities.pop()
+        if last is not entity:
+            self.entities[slot] = last
+            self._slots[last] = slot
+            self.update(last)
+
+    def update(self, entity: game.entity.Entity) -> None:
+        """Copy the current position and graphics of an entity into the arrays."""
+        slot = self._slots[entity]
+        self.x[slot] = entity.x
+        self.y[slot] = entity.y
+        self.ch[slot] = ord(entity.char)
+        self.fg[slot] = entity.color
+
+    def move(self, entity: game.entity.Entity) -> None:
+        """Copy the current position of an entity into the arrays."""
+        slot = self._slots[entity]
+        self.x[slot] = entity.x
+        self.y[slot] = entity.y
+
+    def render(
+        self, console: tcod.console.Console, visible: game.bit_grid.BoolLayer, camera: game.camera.Camera
+    ) -> None:
+        """Draw the entities of this layer which are on `visible` tiles inside `camera`."""
+        count = len(self.entities)
+        x = self.x[:count]
+        y = self.y[:count]
+        shown = (x >= camera.x) & (x < camera.x + camera.width) & (y >= camera.y) & (y < camera.y + camera.height)
+        shown[shown] = visible[x[shown], y[shown]]
+        x = x[shown] + (camera.screen_x - camera.x)
+        y = y[shown] + (camera.screen_y - camera.y)
+        console.rgb["ch"][x, y] = self.ch[:count][shown]
+        console.rgb["fg"][x, y] = self.fg[:count][shown]
+
+
 class GameMap:
+    engine: game.engine.Engine
+
+    debug_spatial_index = False
+    """If True then the spatial index is checked against a full scan of `entities` after every change and query.
+
+    This is very slow and only meant for tracking down code which moves entities without going through this map.
+    """
+
+    use_entity_store = False
+    """If True then maps keep the state of their entities in an `EntityStore`, see `enable_entity_store`.
+
+    Maps generated in worker processes are given their store by `GameWorld.go_to_floor`.
+    """
+
+    use_bit_layers = False
+    """If True then `visible` and `explored` are stored as `BitGrid`s, one bit per tile instead of a byte.
+
+    Maps generated in worker processes or loaded from a save are converted by `GameWorld.go_to_floor`.
+    """
+
     def __init__(
-        self, engine: game.engine.Engine, width: int, height: int, entities: Iterable[game.entity.Entity] = ()
+        self,
+        engine: Optional[game.engine.Engine],
+        width: int,
+        height: int,
+        entities: Iterable[game.entity.Entity] = (),
     ):
-        self.engine = engine
+        if engine is not None:
+            # If engine isn't provided now then it will be set later, such as for maps generated in a worker process.
+            self.engine = engine
         self.width, self.height = width, height
-        self.entities: Set[game.entity.Entity] = set(entities)
+        self.entities: Set[game.entity.Entity] = set()
+        # Entities grouped by how they are drawn, in drawing order.  Kept in sync by the methods below.
+        self._render_layers = {render_order: RenderLayer() for render_order in game.render_order.RenderOrder}
+        self._render_layer_of: Dict[game.entity.Entity, RenderLayer] = {}
+        # Spatial index of entities keyed by their (x, y) position.  Only kept in sync through the methods below.
+        self._entities_by_location: Dict[Tuple[int, int], List[game.entity.Entity]] = {}
+        # Actors which act on their next turn even out of the players sight, see `Engine.handle_enemy_turns`.
+        self.awake_actors: Set[game.entity.Actor] = set()
+        # Column storage for the entities on this map, if enabled.  Entities join it in `add_entity`.
+        self.entity_store: Optional[game.entity_store.EntityStore] = (
+            game.entity_store.EntityStore() if self.use_entity_store else None
+        )
+        for entity in entities:
+            self.add_entity(entity)
         self.tiles = np.full((width, height), fill_value=game.tiles.wall, order="F")
+        self.transparency_version = 0  # Changed by `mark_transparency_changed`, cached FOV results key on this.
 
-        self.visible = np.full((width, height), fill_value=False, order="F")  # Tiles the player can currently see
-        self.explored = np.full((width, height), fill_value=False, order="F")  # Tiles the player has seen before
+        # Tiles the player can currently see, and tiles the player has seen before.
+        self.visible: game.bit_grid.BoolLayer = np.full((width, height), fill_value=False, order="F")
+        self.explored: game.bit_grid.BoolLayer = np.full((width, height), fill_value=False, order="F")
+        if self.use_bit_layers:
+            self.enable_bit_layers()
 
         self.downstairs_location = (0, 0)
+        self.upstairs_location = (0, 0)  # Where the player arrives when coming down from the floor above.
+        self.has_upstairs = False  # False on the first floor, where `upstairs_location` is only the starting point.
+
+        # Map graphics composed from `tiles`, `visible` and `explored` as of the last `render`, see `compose_graphics`.
+        # These full size arrays are only allocated once the map is drawn and are freed by `release_graphics`.
+        self._composed: Optional[NDArray[Any]] = None
+        self._composed_tiles: Optional[NDArray[Any]] = None  # The `tiles` array `_composed` was made from.
+        # Which chunks of `_composed` are up to date with `_composed_tiles`.
+        self._composed_chunks = np.zeros((-(-width // CHUNK_SIZE), -(-height // CHUNK_SIZE)), dtype=bool)
+        self._composed_visible: Optional[NDArray[np.bool_]] = None
+        self._composed_explored: Optional[NDArray[np.bool_]] = None
+        self._changed: Optional[NDArray[np.bool_]] = None  # Scratch buffers for `compose_graphics`.
+        self._changed_explored: Optional[NDArray[np.bool_]] = None
+
+        # Distance map towards the player shared by all monsters, see `get_player_flow_field`.
+        self._player_flow_field: Optional[NDArray[np.int32]] = None
+        self._player_flow_field_key: Tuple[int, int, int] = (-1, -1, -1)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return the state to be pickled.
+
+        The engine is left out so that a map can be pickled on its own, the owner of the map must reattach it.
+        """
+        state = self.__dict__.copy()
+        state.pop("engine", None)
+        state["_player_flow_field"] = None  # Rebuilt on demand.
+        for key in ("_composed", "_composed_tiles", "_composed_visible", "_composed_explored"):
+            state[key] = None  # Composed again when the map is drawn, see `release_graphics`.
+        state["_changed"] = state["_changed_explored"] = None
+        return state
 
     @property
     def gamemap(self) -> GameMap:
@@ -40,13 +228,123 @@ def actors(self) -> Iterator[game.entity.Actor]:
     def items(self) -> Iterator[game.entity.Item]:
         yield from (entity for entity in self.entities if isinstance(entity, game.entity.Item))
 
+    def enable_entity_store(self) -> None:
+        """Move the state of the entities on this map into an `EntityStore`, if it does not have one already."""
+        if self.entity_store is not None:
+            return
+        self.entity_store = game.entity_store.EntityStore(max(64, len(self.entities)))
+        for entity in self.entities:
+            self.entity_store.add(entity)
+
+    def enable_bit_layers(self) -> None:
+        """Pack `visible` and `explored` into `BitGrid`s, if they are not packed already."""
+        if not isinstance(self.visible, game.bit_grid.BitGrid):
+            self.visible = game.bit_grid.BitGrid.from_bools(self.visible)
+        if not isinstance(self.explored, game.bit_grid.BitGrid):
+            self.explored = game.bit_grid.BitGrid.from_bools(self.explored)
+
+    def add_entity(self, entity: game.entity.Entity) -> None:
+        """Add an entity to this map at its current position."""
+        self.entities.add(entity)
+        if self.entity_store is not None:
+            self.entity_store.add(entity)
+        self._entities_by_location.setdefault((entity.x, entity.y), []).append(entity)
+        layer = self._render_layers[entity.render_order]
+        layer.add(entity)
+        self._render_layer_of[entity] = layer
+        if isinstance(entity, game.entity.Actor) and entity.ai is not None and not entity.ai.is_dormant:
+            self.awake_actors.add(entity)
+        if self.debug_spatial_index:
+            self.verify_spatial_index()
+
+    def remove_entity(self, entity: game.entity.Entity) -> None:
+        """Remove an entity from this map."""
+        self.entities.remove(entity)
+        self._unindex_entity(entity)
+        self._render_layer_of.pop(entity).remove(entity)
+        self.awake_actors.discard(entity)  # type: ignore[arg-type]
+        if self.entity_store is not None:
+            self.entity_store.remove(entity)
+        if self.debug_spatial_index:
+            self.verify_spatial_index()
+
+    def move_entity(self, entity: game.entity.Entity, x: int, y: int) -> None:
+        """Move an entity on this map to a new position, keeping the spatial index in sync."""
+        self._unindex_entity(entity)
+        entity.x = x
+        entity.y = y
+        self._entities_by_location.setdefault((x, y), []).append(entity)
+        self._render_layer_of[entity].move(entity)
+        if self.debug_spatial_index:
+            self.verify_spatial_index()
+
+    def update_entity_graphics(self, entity: game.entity.Entity) -> None:
+        """Must be called after the `char`, `color` or `render_order` of an entity on this map is changed."""
+        layer = self._render_layers[entity.render_order]
+        if self._render_layer_of[entity] is not layer:
+            self._render_layer_of[entity].remove(entity)
+            layer.add(entity)
+            self._render_layer_of[entity] = layer
+        else:
+            layer.update(entity)
+        if self.entity_store is not None:
+            self.entity_store.update_graphics(entity, entity.store_id)
+
+    def _unindex_entity(self, entity: game.entity.Entity) -> None:
+        """Remove an entity from the spatial index at its current position."""
+        location = entity.x, entity.y
+        entities_here = self._entities_by_location[location]
+        entities_here.remove(entity)
+        if not entities_here:
+            del self._entities_by_location[location]
+
+    def verify_spatial_index(self) -> None:
+        """Raise AssertionError if the spatial index or render layers do not match the positions of `entities`."""
+        expected: Dict[Tuple[int, int], Set[game.entity.Entity]] = {}
+        for entity in self.entities:
+            expected.setdefault((entity.x, entity.y), set()).add(entity)
+        indexed = {location: set(entities_here) for location, entities_here in self._entities_by_location.items()}
+        if indexed != expected:
+            stale = {
+                location
+                for location in indexed.keys() | expected.keys()
+                if indexed.get(location) != expected.get(location)
+            }
+            raise AssertionError(f"Spatial index is out of sync at {sorted(stale)}.")
+        indexed_count = sum(len(entities_here) for entities_here in self._entities_by_location.values())
+        if indexed_count != len(self.entities):
+            raise AssertionError(f"Spatial index holds {indexed_count} entries for {len(self.entities)} entities.")
+        if self.entity_store is not None:
+            if len(self.entity_store) != len(self.entities):
+                raise AssertionError(
+                    f"Entity store holds {len(self.entity_store)} rows for {len(self.entities)} entities."
+                )
+            for entity in self.entities:
+                if entity.store is not self.entity_store or self.entity_store.entities[entity.store_id] is not entity:
+                    raise AssertionError(f"{entity.name} is not in the entity store of its map.")
+        for entity in self.entities:
+            layer = self._render_layers[entity.render_order]
+            if self._render_layer_of.get(entity) is not layer:
+                raise AssertionError(f"{entity.name} is in the wrong render layer.")
+            slot = layer.entities.index(entity)
+            if (layer.x[slot], layer.y[slot]) != (entity.x, entity.y):
+                raise AssertionError(f"Render layer position of {entity.name} is out of sync.")
+
+    def get_entities_at_location(self, x: int, y: int) -> Sequence[game.entity.Entity]:
+        """Return all entities at the given position."""
+        if self.debug_spatial_index:
+            self.verify_spatial_index()
+        return tuple(self._entities_by_location.get((x, y), ()))
+
     def get_blocking_entity_at_location(
         self,
         location_x: int,
         location_y: int,
     ) -> Optional[game.entity.Entity]:
-        for entity in self.entities:
-            if entity.blocks_movement and entity.x == location_x and entity.y == location_y:
+        if self.debug_spatial_index:
+            self.verify_spatial_index()
+        for entity in self._entities_by_location.get((location_x, location_y), ()):
+            if entity.blocks_movement:
                 return entity
 
         return None
@@ -56,50 +354,270 @@ def get_blocking_entity_at(self, x: int, y: int) -> Optional[game.entity.Entity]
         return self.get_blocking_entity_at_location(x, y)
 
     def get_actor_at_location(self, x: int, y: int) -> Optional[game.entity.Actor]:
-        for actor in self.actors:
-            if actor.x == x and actor.y == y:
-                return actor
+        if self.debug_spatial_index:
+            self.verify_spatial_index()
+        for entity in self._entities_by_location.get((x, y), ()):
+            if isinstance(entity, game.entity.Actor) and entity.is_alive:
+                return entity
 
         return None
 
+    def _locations_within(self, x: int, y: int, radius: int) -> Iterator[Tuple[int, int]]:
+        """Yield the occupied positions within `radius` of (x, y), nearest first.
+
+        Either each tile of the disk is looked up or every occupied position is checked, whichever is fewer.
+        """
+        dx, dy = game.stencils.disk_offsets(radius)
+        if len(dx) <= len(self._entities_by_location):
+            index = self._entities_by_location
+            yield from (location for location in zip((dx + x).tolist(), (dy + y).tolist()) if location in index)
+            return
+        limit = radius * radius
+        found = [
+            location
+            for location in self._entities_by_location
+            if (location[0] - x) ** 2 + (location[1] - y) ** 2 <= limit
+        ]
+        found.sort(key=functools.partial(game.stencils.nearest_first, x, y))
+        yield from found
+
+    def get_actors_in_area(self, area: Tuple[slice, slice]) -> List[game.entity.Actor]:
+        """Return the living actors inside an area of the map.
+
+        Either each tile of the area is looked up or every occupied position is checked, whichever is fewer.
+        """
+        if self.debug_spatial_index:
+            self.verify_spatial_index()
+        index = self._entities_by_location
+        x_range = range(*area[0].indices(self.width))
+        y_range = range(*area[1].indices(self.height))
+        locations: Iterable[Tuple[int, int]]
+        if len(x_range) * len(y_range) <= len(index):
+            locations = (location for location in itertools.product(x_range, y_range) if location in index)
+        else:
+            locations = (location for location in index if location[0] in x_range and location[1] in y_range)
+        return [
+            entity
+            for location in locations
+            for entity in index[location]
+            if isinstance(entity, game.entity.Actor) and entity.is_alive
+        ]
+
+    def wake(self, actor: game.entity.Actor) -> None:
+        """Give an actor its next turn even if it is dormant and out of sight, such as after it was hurt.
+
+        It stays awake for as long as its AI is not dormant, see `Engine.handle_enemy_turns`.
+        """
+        self.awake_actors.add(actor)
+
+    def get_actors_in_radius(self, x: int, y: int, radius: int) -> List[game.entity.Actor]:
+        """Return the living actors within `radius` of (x, y), nearest first.
+
+        The area is the same as `game.stencils.disk_mask(radius)` centered on (x, y).
+        """
+        if self.debug_spatial_index:
+            self.verify_spatial_index()
+        return [
+            entity
+            for location in self._locations_within(x, y, radius)
+            for entity in self._entities_by_location[location]
+            if isinstance(entity, game.entity.Actor) and entity.is_alive
+        ]
+
+    def get_nearest_visible_actors(
+        self, x: int, y: int, count: int, max_distance: int, *, exclude: Optional[game.entity.Entity] = None
+    ) -> List[game.entity.Actor]:
+        """Return up to `count` living actors on visible tiles within `max_distance` of (x, y), nearest first."""
+        if self.debug_spatial_index:
+            self.verify_spatial_index()
+        found: List[game.entity.Actor] = []
+        for location in self._locations_within(x, y, max_distance):
+            if not self.visible[location]:
+                continue
+            for entity in self._entities_by_location[location]:
+                if entity is not exclude and isinstance(entity, game.entity.Actor) and entity.is_alive:
+                    found.append(entity)
+                    if len(found) >= count:
+                        return found
+        return found
+
+    def mark_transparency_changed(self) -> None:
+        """Invalidate cached FOV results and composed graphics for this map.
+
+        Must be called after `tiles` is modified in a way which changes what is transparent, such as opening a door.
+        Assigning a new array to `tiles` is detected without this.
+        """
+        self.transparency_version += 1
+        self._composed_tiles = None
+
+    def get_player_flow_field(self) -> NDArray[np.int32]:
+        """Return a Dijkstra distance map rooted at the player.
+
+        The map is computed once per turn and shared by every monster chasing the player, monsters follow it by
+        stepping to their cheapest neighbor.  Unreachable tiles hold the maximum int32 value.
+        """
+        player = self.engine.player
+        key = self.engine.turn, player.x, player.y
+        if self._player_flow_field is not None and self._player_flow_field_key == key:
+            return self._player_flow_field
+
+        cost = np.array(self.tiles["walkable"], dtype=np.int32, order="F")
+        if self.entity_store is not None:
+            # Same as the loop below using the store columns.  Repeated indexes are only incremented once.
+            blocking_x, blocking_y = self.entity_store.blocking_positions()
+            walkable = cost[blocking_x, blocking_y] != 0
+            cost[blocking_x[walkable], blocking_y[walkable]] += 10
+        else:
+            for (x, y), entities_here in self._entities_by_location.items():
+                # Check that an entity blocks movement and the cost isn't zero (blocking.)
+                if cost[x, y] and any(entity.blocks_movement for entity in entities_here):
+                    # Add to the cost of a blocked position.
+                    # A lower number means more enemies will crowd behind each other in
+                    # hallways.  A higher number means enemies will take longer paths in
+                    # order to surround the player.
+                    cost[x, y] += 10
+
+        distance: NDArray[np.int32] = tcod.path.maxarray((self.width, self.height), dtype=np.int32, order="F")
+        distance[player.x, player.y] = 0
+        tcod.path.dijkstra2d(distance, cost, cardinal=2, diagonal=3, out=distance)
+
+        self._player_flow_field = distance
+        self._player_flow_field_key = key
+        return distance
+
     def in_bounds(self, x: int, y: int) -> bool:
         """Return True if x and y are inside of the bounds of this map."""
         return 0 <= x < self.width and 0 <= y < self.height
 
-    def render(self, console: tcod.console.Console) -> None:
+    def compose_graphics(self, area: Optional[Tuple[slice, slice]] = None) -> NDArray[Any]:
+        """Return the graphics of the tiles in `area` given the current `visible` and `explored` arrays.
+
+        `area` is a pair of slices with a start and stop, by default the whole map.  The result uses the layout of
+        `tcod.console.Console.rgba`.  Graphics are kept between calls in chunks of `CHUNK_SIZE` by `CHUNK_SIZE` tiles: a
+        chunk is composed in full the first time it is in `area` after `tiles` changed, after that only the tiles whose
+        visible or explored state changed are composed again.  The cost depends on the size of `area` rather than the
+        size of the map.  The returned array is a view of the kept graphics and must not be modified.
         """
-        Renders the map.
+        if area is None:
+            area = slice(0, self.width), slice(0, self.height)
+        if self._composed is None:
+            shape = self.width, self.height
+            self._composed = np.empty(shape, dtype=tcod.console.rgba_graphic, order="F")
+            self._composed["fg"][..., 3] = 255
+            self._composed["bg"][..., 3] = 255
+            self._composed_tiles = None
+            self._composed_visible = np.zeros(shape, dtype=bool, order="F")
+            self._composed_explored = np.zeros(shape, dtype=bool, order="F")
+            self._changed = np.zeros(shape, dtype=bool, order="F")
+            self._changed_explored = np.zeros(shape, dtype=bool, order="F")
+        composed_visible, composed_explored = self._composed_visible, self._composed_explored
+        assert composed_visible is not None and composed_explored is not None
+        assert self._changed is not None and self._changed_explored is not None
+        if self._composed_tiles is not self.tiles:
+            self._composed_chunks[...] = False
+            self._composed_tiles = self.tiles
+
+        x_area, y_area = area
+        chunk_x = x_area.start // CHUNK_SIZE
+        chunk_y = y_area.start // CHUNK_SIZE
+        chunks = self._composed_chunks[chunk_x : -(-x_area.stop // CHUNK_SIZE), chunk_y : -(-y_area.stop // CHUNK_SIZE)]
+        if not chunks.all():
+            for x, y in zip(*(~chunks).nonzero()):
+                x = (chunk_x + x) * CHUNK_SIZE
+                y = (chunk_y + y) * CHUNK_SIZE
+                chunk = slice(x, x + CHUNK_SIZE), slice(y, y + CHUNK_SIZE)
+                visible = self.visible[chunk]
+                explored = self.explored[chunk]
+                self._set_composed(
+                    chunk,
+                    np.select(
+                        condlist=[visible, explored],
+                        choicelist=[self.tiles["light"][chunk], self.tiles["dark"][chunk]],
+                        default=game.tiles.SHROUD,
+                    ),
+                )
+                composed_visible[chunk] = visible
+                composed_explored[chunk] = explored
+            chunks[...] = True
+
+        changed = np.not_equal(self.visible[area], composed_visible[area], out=self._changed[area])
+        changed |= np.not_equal(self.explored[area], composed_explored[area], out=self._changed_explored[area])
+        if changed.any():
+            x, y = changed.nonzero()
+            x += x_area.start
+            y += y_area.start
+            visible = self.visible[x, y]
+            explored = self.explored[x, y]
+            self._set_composed(
+                (x, y),
+                np.select(
+                    condlist=[visible, explored],
+                    choicelist=[self.tiles["light"][x, y], self.tiles["dark"][x, y]],
+                    default=game.tiles.SHROUD,
+                ),
+            )
+            composed_visible[x, y] = visible
+            composed_explored[x, y] = explored
+        return self._composed[area]
+
+    def release_graphics(self) -> None:
+        """Free the graphics kept by `compose_graphics`, they are composed again when this map is next drawn."""
+        self._composed = self._composed_tiles = None
+        self._composed_visible = self._composed_explored = None
+        self._changed = self._changed_explored = None
+
+    def _set_composed(self, index: Tuple[Any, Any], graphics: NDArray[Any]) -> None:
+        """Write `graphics` of `game.tiles.graphic_dt` into the composed graphics at `index`."""
+        assert self._composed is not None
+        self._composed["ch"][index] = graphics["ch"]
+        self._composed["fg"][index + (slice(0, 3),)] = graphics["fg"]
+        self._composed["bg"][index + (slice(0, 3),)] = graphics["bg"]
+
+    def render(self, console: tcod.console.Console, camera: Optional[game.camera.Camera] = None) -> None:
+        """
+        Renders the part of the map inside `camera`, or the whole map at the top-left of `console` if not given.
 
         If a tile is in the "visible" array, then draw it with the "light" colors.
         If it isn't, but it's in the "explored" array, then draw it with the "dark" colors.
         Otherwise, the default is "SHROUD".
         """
-        console.rgb[0 : self.width, 0 : self.height] = np.select(
-            condlist=[self.visible, self.explored],
-            choicelist=[self.tiles["light"], self.tiles["dark"]],
-            default=game.tiles.SHROUD,
+        if camera is None:
+            camera = game.camera.Camera(self.width, self.height)
+        area = camera.map_area(self.width, self.height)
+        graphics = self.compose_graphics(area)
+        screen_x, screen_y = camera.map_to_screen(area[0].start, area[1].start)
+        width, height = graphics.shape
+        # Copied as raw bytes, which is much faster than copying structured values field by field.
+        raw_dtype = np.dtype((np.void, graphics.dtype.itemsize))
+        console.rgba[screen_x : screen_x + width, screen_y : screen_y + height].view(raw_dtype)[...] = graphics.view(
+            raw_dtype
         )
 
-        entities_sorted_for_rendering = sorted(self.entities, key=lambda x: x.render_order.value)
-
-        for entity in entities_sorted_for_rendering:
-            # Only print entities that are in the FOV
-            if self.visible[entity.x, entity.y]:
-                console.print(x=entity.x, y=entity.y, string=entity.char, fg=entity.color)
+        # Only draw entities that are in the FOV, later layers are drawn over earlier ones.
+        for layer in self._render_layers.values():
+            layer.render(console, self.visible, camera)
 
         # Show stairs
-        if self.visible[self.downstairs_location]:
-            console.print(
-                x=self.downstairs_location[0],
-                y=self.downstairs_location[1],
-                string=">",
-                fg=(255, 255, 255),
-            )
+        stairs = [(self.downstairs_location, ">")]
+        if self.has_upstairs:
+            stairs.append((self.upstairs_location, "<"))
+        for (x, y), string in stairs:
+            if camera.in_view(x, y) and self.visible[x, y]:
+                screen_x, screen_y = camera.map_to_screen(x, y)
+                console.print(x=screen_x, y=screen_y, string=string, fg=(255, 255, 255))
 
 
 class GameWorld:
     """
     Holds the settings for the GameMap, and generates new maps when moving down the stairs.
+
+    Visited floors are kept so that they can be returned to.  At most `max_resident_floors` of them are held in memory,
+    the least recently visited floors are compressed into per-floor files in `floor_directory` and loaded again when
+    they are revisited.  Games which are saved keep this directory next to their save file, see `setup_game.new_game`.
+    Each eviction writes a new file, so the files a save refers to stay as they were until a later save replaces it,
+    see `remove_unused_floor_files`.
+
+    If `pregenerate` is True then the next floor is generated in a worker process while the current one is explored.
     """
 
     def __init__(
@@ -111,7 +629,12 @@ def __init__(
         max_rooms: int,
         room_min_size: int,
         room_max_size: int,
+        resample_rejected_rooms: bool = False,
+        spawn_tables_path: Optional[str] = None,
         current_floor: int = 0,
+        pregenerate: bool = False,
+        max_resident_floors: int = 3,
+        floor_directory: Optional[str] = None,
     ):
         self.engine = engine
 
@@ -122,20 +645,180 @@ def __init__(
 
         self.room_min_size = room_min_size
         self.room_max_size = room_max_size
+        self.resample_rejected_rooms = resample_rejected_rooms  # See `generate_dungeon`.
+        self.spawn_tables_path = spawn_tables_path  # JSON spawn tables to use instead of the defaults in procgen.
 
         self.current_floor = current_floor
 
-    def generate_floor(self) -> None:
-        from game.procgen import generate_dungeon
+        self.max_resident_floors = max_resident_floors
+        # Without a directory of its own the world spills to a temporary directory, deleted along with the world.
+        self._temporary_directory: Optional[tempfile.TemporaryDirectory[str]] = None
+        if floor_directory is None:
+            self._temporary_directory = tempfile.TemporaryDirectory(prefix="floors-")
+            floor_directory = self._temporary_directory.name
+        self.floor_directory = floor_directory
+        # Floors held in memory, from least to most recently visited.
+        self.resident_floors: collections.OrderedDict[int, GameMap] = collections.OrderedDict()
+        # Floors which were evicted to `floor_directory`, with the name of the file each one is in.
+        self.spilled_floors: Dict[int, str] = {}
+        # Files and directories of the games this one replaces, deleted once this game is saved.  See `new_game`.
+        self.replaced_directories: List[str] = []
+
+        self.pregenerate = pregenerate
+        # Each floor is generated from its own seed, so it comes out the same whether it was generated ahead of time
+        # or not.
+        self.seed = random.getrandbits(64)
+        self._pregenerated: Optional[Tuple[int, concurrent.futures.Future[GameMap]]] = None
+
+    def _floor_parameters(self, floor: int) -> Dict[str, Any]:
+        """Return the keyword arguments for `generate_detached_dungeon` on the given floor."""
+        return {
+            "seed": self.seed + floor,
+            "max_rooms": self.max_rooms,
+            "room_min_size": self.room_min_size,
+            "room_max_size": self.room_max_size,
+            "map_width": self.map_width,
+            "map_height": self.map_height,
+            "current_floor": floor,
+            "resample_rejected": self.resample_rejected_rooms,
+            "spawn_tables_path": self.spawn_tables_path,
+        }
+
+    def _take_pregenerated_floor(self, floor: int) -> Optional[GameMap]:
+        """Return the given floor if it has finished generating in the background, otherwise return None."""
+        if self._pregenerated is None:
+            return None
+        pregenerated_floor, future = self._pregenerated
+        self._pregenerated = None
+        if pregenerated_floor != floor or not future.done():
+            future.cancel()
+            return None
+        try:
+            return future.result()
+        except Exception:
+            traceback.print_exc()  # Fall back to generating the floor synchronously.
+            return None
+
+    def _pregenerate_floor(self, floor: int) -> None:
+        """Start generating the given floor in the background."""
+        from game.procgen import generate_detached_dungeon
+
+        try:
+            future = get_floor_executor().submit(generate_detached_dungeon, **self._floor_parameters(floor))
+        except concurrent.futures.process.BrokenProcessPool:
+            traceback.print_exc()  # The worker died, the floor will be generated synchronously.
+            if self._pregenerated is not None:
+                self._pregenerated[1].cancel()
+                self._pregenerated = None
+            discard_floor_executor()
+        else:
+            self._pregenerated = floor, future
+
+    def is_visited(self, floor: int) -> bool:
+        """Return True if the given floor has already been generated."""
+        return floor in self.resident_floors or floor in self.spilled_floors
+
+    def generate_floor(self, floor: int) -> GameMap:
+        """Return a newly generated map for the given floor, without an engine or the player."""
+        from game.procgen import generate_detached_dungeon
+
+        game_map = self._take_pregenerated_floor(floor)
+        if game_map is None:
+            game_map = generate_detached_dungeon(**self._floor_parameters(floor))
+        return game_map
+
+    def floor_path(self, floor: int) -> str:
+        """Return the file path the given floor is stored at while it is evicted from memory."""
+        return os.path.join(self.floor_directory, self.spilled_floors[floor])
+
+    def _spill_floor(self, floor: int, game_map: GameMap) -> None:
+        """Write an evicted floor to a new file."""
+        from game.serialization import save_floor
+
+        os.makedirs(self.floor_directory, exist_ok=True)
+        self.spilled_floors[floor] = f"floor_{floor}_{uuid.uuid4().hex}.sav"
+        save_floor(game_map, self.floor_path(floor))
+
+    def _load_floor(self, floor: int) -> GameMap:
+        """Load an evicted floor back from its file.
+
+        The file is kept, the last save may still refer to it.  It is deleted by `remove_unused_floor_files`.
+        """
+        from game.serialization import load_floor
 
-        self.current_floor += 1
+        game_map = load_floor(self.floor_path(floor))
+        del self.spilled_floors[floor]
+        return game_map
 
-        self.engine.game_map = generate_dungeon(
-            max_rooms=self.max_rooms,
-            room_min_size=self.room_min_size,
-            room_max_size=self.room_max_size,
-            map_width=self.map_width,
-            map_height=self.map_height,
-            current_floor=self.current_floor,
-            engine=self.engine,
-        )
+    def floor_files(self) -> Set[str]:
+        """Return the names of the files in `floor_directory` this world refers to."""
+        return set(self.spilled_floors.values())
+
+    def remove_unused_floor_files(self, keep: Iterable[str] = ()) -> None:
+        """Delete the floor files in `floor_directory` which neither this world nor `keep` refers to.
+
+        Call this once a save is completely written, with the `floor_files` of the world when it was saved as `keep`.
+        The files of older saves are not needed after that, and neither are the `replaced_directories`.
+        """
+        for path in self.replaced_directories:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+        self.replaced_directories = []
+        try:
+            names = os.listdir(self.floor_directory)
+        except FileNotFoundError:
+            return
+        used = self.floor_files().union(keep)
+        for name in names:
+            if name.startswith("floor_") and name.endswith(".sav") and name not in used:
+                os.remove(os.path.join(self.floor_directory, name))
+
+    def get_floor(self, floor: int) -> GameMap:
+        """Return the map for the given floor, loading or generating it as needed."""
+        if floor in self.resident_floors:
+            return self.resident_floors[floor]
+        if floor in self.spilled_floors:
+            return self._load_floor(floor)
+        return self.generate_floor(floor)
+
+    def go_to_floor(self, floor: int, *, arrive_by_upstairs: bool) -> None:
+        """Move the player to the given floor, arriving at its stairs up or down."""
+        game_map = self.get_floor(floor)
+        game_map.engine = self.engine
+        if GameMap.use_entity_store:
+            game_map.enable_entity_store()
+        if GameMap.use_bit_layers:
+            game_map.enable_bit_layers()
+
+        previous_map: Optional[GameMap] = getattr(self.engine, "game_map", None)
+        if previous_map is not None and previous_map is not game_map:
+            previous_map.release_graphics()  # Only the current map is drawn.
+
+        self.current_floor = floor
+        self.resident_floors[floor] = game_map
+        self.resident_floors.move_to_end(floor)
+
+        self.engine.game_map = game_map
+        if arrive_by_upstairs:
+            self.engine.player.place(*game_map.upstairs_location, game_map)
+        else:
+            self.engine.player.place(*game_map.downstairs_location, game_map)
+
+        # Spill floors only after the player has left them, the current floor is the most recent one and is kept.
+        while len(self.resident_floors) > max(1, self.max_resident_floors):
+            evicted_floor, evicted_map = self.resident_floors.popitem(last=False)
+            self._spill_floor(evicted_floor, evicted_map)
+
+        if self.pregenerate and not self.is_visited(floor + 1):
+            self._pregenerate_floor(floor + 1)
+
+    def descend(self) -> None:
+        """Move the player down to the next floor."""
+        self.go_to_floor(self.current_floor + 1, arrive_by_upstairs=True)
+
+    def ascend(self) -> None:
+        """Move the player up to the previous floor."""
+        assert self.current_floor > 1, "There is no floor above the first one."
+        self.go_to_floor(self.current_floor - 1, arrive_by_upstairs=False)
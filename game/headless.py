@@ -0,0 +1,206 @@
+"""Run game sessions without a window, driven by a scripted player."""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import random
+import time
+
+from numpy.typing import NDArray
+import numpy as np
+import tcod
+
+import game.actions
+import game.autosave
+import game.engine
+import game.game_map
+import game.input_handlers
+import game.setup_game
+
+DIRECTIONS = [(-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)]
+
+PHASES = ("action", "enemy_turns", "fov", "procgen", "render", "autosave")
+
+
+class Bot:
+    """A scripted player which fights anything next to it and otherwise heads for the stairs down.
+
+    The bot waits at the stairs until it has spent at least `min_floor_turns` turns on the floor, which gives a more
+    realistic pace than descending as fast as possible.
+    """
+
+    def __init__(self, engine: game.engine.Engine, *, min_floor_turns: int = 0):
+        self.engine = engine
+        self.min_floor_turns = min_floor_turns
+        self.floor_turns = 0
+        self._stairs_map: Optional[game.game_map.GameMap] = None
+        self._stairs_distance: Optional[NDArray[np.int32]] = None
+
+    def stairs_distance(self) -> NDArray[np.int32]:
+        """Return a distance map rooted at the stairs down of the current floor."""
+        game_map = self.engine.game_map
+        if self._stairs_map is not game_map or self._stairs_distance is None:
+            cost = np.array(game_map.tiles["walkable"], dtype=np.int32, order="F")
+            distance: NDArray[np.int32] = tcod.path.maxarray((game_map.width, game_map.height), order="F")
+            distance[game_map.downstairs_location] = 0
+            tcod.path.dijkstra2d(distance, cost, cardinal=2, diagonal=3, out=distance)
+            self._stairs_map = game_map
+            self._stairs_distance = distance
+            self.floor_turns = 0
+        return self._stairs_distance
+
+    def next_action(self) -> game.actions.Action:
+        """Return the action the player takes this turn."""
+        player = self.engine.player
+        game_map = self.engine.game_map
+        stairs_distance = self.stairs_distance()
+        self.floor_turns += 1
+
+        for dx, dy in DIRECTIONS:
+            target = game_map.get_actor_at_location(player.x + dx, player.y + dy)
+            if target is not None and target is not player:
+                return game.actions.BumpAction(player, dx, dy)
+
+        if (player.x, player.y) == game_map.downstairs_location:
+            if self.floor_turns < self.min_floor_turns:
+                return game.actions.WaitAction(player)
+            return game.actions.TakeStairsAction(player)
+
+        path = tcod.path.hillclimb2d(stairs_distance, (player.x, player.y), cardinal=True, diagonal=True)
+        if len(path) < 2:
+            return game.actions.WaitAction(player)  # The stairs can not be reached.
+        dest_x, dest_y = path[1].tolist()
+        return game.actions.BumpAction(player, dest_x - player.x, dest_y - player.y)
+
+
+class Simulation:
+    """Plays turns on an Engine from `game.setup_game.new_game` using a Bot, and records where the time goes.
+
+    Actions go through `EventHandler.handle_action` exactly like keyboard input does.  A new game is started when the
+    player dies.  If `render` is True then each turn is also drawn to an offscreen console.  `pregenerate_floors` is
+    passed on to `new_game` and `min_floor_turns` to the Bot.  If an `autosaver` is given it is called after every turn
+    the same way the main loop does.
+    """
+
+    def __init__(
+        self,
+        *,
+        render: bool = False,
+        seed: Optional[int] = None,
+        pregenerate_floors: bool = False,
+        min_floor_turns: int = 0,
+        autosaver: Optional[game.autosave.Autosaver] = None,
+    ):
+        if seed is not None:
+            random.seed(seed)
+        self.render = render
+        self.pregenerate_floors = pregenerate_floors
+        self.min_floor_turns = min_floor_turns
+        self.autosaver = autosaver
+        self.console = tcod.console.Console(80, 50, order="F")
+        self.turns = 0
+        self.floors = 0
+        self.deaths = 0
+        self.elapsed = 0.0
+        self.phase_seconds: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self.stall_seconds: List[float] = []  # Time taken by each TakeStairsAction.
+        self.max_turn_seconds = 0.0  # Longest time spent on a turn which did not take the stairs.
+        self.start_game()
+
+    def start_game(self) -> None:
+        """Start a new game and instrument its engine."""
+        self.engine = game.setup_game.new_game(pregenerate_floors=self.pregenerate_floors)
+        self.handler = game.input_handlers.MainGameEventHandler(self.engine)
+        self.bot = Bot(self.engine, min_floor_turns=self.min_floor_turns)
+        self.engine.handle_enemy_turns = self._timed("enemy_turns", self.engine.handle_enemy_turns)  # type: ignore
+        self.engine.update_fov = self._timed("fov", self.engine.update_fov)  # type: ignore
+        world = self.engine.game_world
+        world.generate_floor = self._timed("procgen", world.generate_floor)  # type: ignore
+
+    def detach_engine(self) -> game.engine.Engine:
+        """Remove the timing wrappers from the current engine and return it, so that it can be pickled."""
+        del self.engine.handle_enemy_turns
+        del self.engine.update_fov
+        del self.engine.game_world.generate_floor
+        return self.engine
+
+    def _timed(self, phase: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap `func` so that its run time is added to `phase`."""
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.phase_seconds[phase] += time.perf_counter() - start
+
+        return wrapper
+
+    def step(self) -> None:
+        """Play a single turn."""
+        player = self.engine.player
+        action = self.bot.next_action()
+        nested_before = sum(self.phase_seconds[phase] for phase in ("enemy_turns", "fov", "procgen"))
+        start = time.perf_counter()
+        self.handler.handle_action(action)
+        total = time.perf_counter() - start
+        nested_after = sum(self.phase_seconds[phase] for phase in ("enemy_turns", "fov", "procgen"))
+        self.phase_seconds["action"] += total - (nested_after - nested_before)
+        self.turns += 1
+
+        if self.autosaver is not None:
+            start = time.perf_counter()
+            self.autosaver.on_turn(self.engine)
+            autosave_seconds = time.perf_counter() - start
+            self.phase_seconds["autosave"] += autosave_seconds
+            total += autosave_seconds
+
+        if isinstance(action, game.actions.TakeStairsAction):
+            self.floors += 1
+            self.stall_seconds.append(total)
+        else:
+            self.max_turn_seconds = max(self.max_turn_seconds, total)
+
+        if self.render:
+            start = time.perf_counter()
+            self.console.clear()
+            self.handler.on_render(self.console)
+            self.phase_seconds["render"] += time.perf_counter() - start
+
+        if not player.is_alive:
+            self.deaths += 1
+            self.start_game()
+        elif player.level.requires_level_up:
+            player.level.increase_power()
+
+    def run(self, *, turns: int, max_seconds: Optional[float] = None) -> None:
+        """Play up to `turns` turns, stopping early after `max_seconds` of wall time."""
+        start = time.perf_counter()
+        for _ in range(turns):
+            self.step()
+            if max_seconds is not None and time.perf_counter() - start >= max_seconds:
+                break
+        self.elapsed += time.perf_counter() - start
+
+    def report(self) -> List[Tuple[str, str]]:
+        """Return the collected statistics as (label, value) rows."""
+        elapsed = self.elapsed or float("inf")
+        turns = self.turns or 1
+        rows = [
+            ("turns", f"{self.turns}"),
+            ("floors descended", f"{self.floors}"),
+            ("deaths", f"{self.deaths}"),
+            ("elapsed", f"{self.elapsed:.3f} s"),
+            ("turns/sec", f"{self.turns / elapsed:.1f}"),
+            ("floors/sec", f"{self.floors / elapsed:.2f}"),
+        ]
+        for phase in PHASES:
+            seconds = self.phase_seconds[phase]
+            rows.append((f"{phase} time", f"{seconds:.3f} s ({seconds / turns * 1e6:.1f} us/turn)"))
+        rows.append(("turn time max", f"{self.max_turn_seconds * 1000:.2f} ms"))
+        if self.autosaver is not None:
+            rows.append(("autosaves", f"{self.autosaver.saves}"))
+        if self.stall_seconds:
+            rows.append(("stairs stall avg", f"{sum(self.stall_seconds) / len(self.stall_seconds) * 1000:.2f} ms"))
+            rows.append(("stairs stall max", f"{max(self.stall_seconds) * 1000:.2f} ms"))
+        return rows
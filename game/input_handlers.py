@@ -9,6 +9,9 @@
 import game.color
 import game.entity
 import game.exceptions
+import game.message_log
+import game.metrics
+import game.stencils
 
 if TYPE_CHECKING:
     import game.engine
@@ -105,21 +108,25 @@ def handle_action(self, action: Optional[game.actions.Action]) -> bool:
             return False
 
         try:
-            action.perform()
+            action.perform()  # Timed as "action.<class name>", see `game.actions.Action`.
         except game.exceptions.Impossible as exc:
             self.engine.message_log.add_message(exc.args[0], game.color.impossible)
             return False  # Skip enemy turn on exceptions.
 
-        self.engine.handle_enemy_turns()
-        self.engine.update_fov()  # Update the FOV before the players next action.
+        with game.metrics.timed("turn.enemy_turns"):
+            self.engine.handle_enemy_turns()
+        with game.metrics.timed("turn.fov"):
+            self.engine.update_fov()  # Update the FOV before the players next action.
         return True
 
     def on_render(self, console: tcod.console.Console) -> None:
         self.engine.render(console)
 
     def ev_mousemotion(self, event: tcod.event.MouseMotion) -> None:
-        if self.engine.game_map.in_bounds(int(event.position.x), int(event.position.y)):
-            self.engine.mouse_location = int(event.position.x), int(event.position.y)
+        camera = self.engine.camera
+        x, y = camera.screen_to_map(int(event.position.x), int(event.position.y))
+        if camera.in_view(x, y) and self.engine.game_map.in_bounds(x, y):
+            self.engine.mouse_location = x, y
 
 
 class MainGameEventHandler(EventHandler):
@@ -155,6 +162,9 @@ def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[ActionOrHandler]:
             else:
                 # Wait if user presses '.'
                 action = game.actions.WaitAction(player)
+        elif key == tcod.event.KeySym.COMMA and modifiers & (tcod.event.KMOD_LSHIFT | tcod.event.KMOD_RSHIFT):
+            # Take stairs up if user presses '<'
+            action = game.actions.TakeStairsAction(player)
 
         # No valid key was pressed
         return action
@@ -169,43 +179,79 @@ def handle_events(self, event: tcod.event.Event) -> BaseEventHandler:
 
 
 class HistoryViewer(EventHandler):
-    """Print the history on a larger window which can be navigated."""
+    """Print the history on a larger window which can be navigated.
+
+    The messages are wrapped once into a line index, each frame only draws the lines on screen.
+    """
 
     def __init__(self, engine: game.engine.Engine):
         super().__init__(engine)
         self.log_length = len(engine.message_log.messages)
-        self.cursor = self.log_length - 1
+        self.cursor = self.log_length - 1  # The message shown at the bottom of the window.
+        self.page_height = 1  # Number of lines shown at once, set when rendered.
+        self.wrapped_lines: Optional[game.message_log.WrappedLines] = None
+        self.log_console: Optional[tcod.console.Console] = None  # Reused between frames.
+
+    def get_wrapped_lines(self, width: int) -> game.message_log.WrappedLines:
+        """Return the messages wrapped to `width`, wrapping them only when first needed or when the width changes."""
+        if self.wrapped_lines is None or self.wrapped_lines.width != width:
+            self.wrapped_lines = game.message_log.WrappedLines(self.engine.message_log.messages, width)
+        return self.wrapped_lines
 
     def on_render(self, console: tcod.console.Console) -> None:
         super().on_render(console)  # Draw the main state as the background.
 
-        log_console = tcod.console.Console(console.width - 6, console.height - 6)
+        width, height = console.width - 6, console.height - 6
+        if self.log_console is None or (self.log_console.width, self.log_console.height) != (width, height):
+            self.log_console = tcod.console.Console(width, height)
+        log_console = self.log_console
+        log_console.clear()
 
         # Draw a frame with a custom banner title.
         log_console.draw_frame(0, 0, log_console.width, log_console.height)
         log_console.print_box(0, 0, log_console.width, 1, "┤Message history├", alignment=libtcodpy.CENTER)
 
-        # Render the message log using the cursor parameter.
-        self.engine.message_log.render_messages(
-            log_console,
-            1,
-            1,
-            log_console.width - 2,
-            log_console.height - 2,
-            self.engine.message_log.messages[: self.cursor + 1],
-        )
+        # Render the lines which end with the message at the cursor.
+        self.page_height = log_console.height - 2
+        wrapped_lines = self.get_wrapped_lines(log_console.width - 2)
+        if self.log_length:
+            stop = wrapped_lines.starts[self.cursor + 1]
+            start = max(0, stop - self.page_height)
+            y = 1 + self.page_height - (stop - start)  # Keep the lines at the bottom when there are only a few.
+            for y_offset, (text, fg) in enumerate(wrapped_lines.lines(start, stop)):
+                log_console.print(x=1, y=y + y_offset, string=text, fg=fg)
         log_console.blit(console, 3, 3)
 
+    def jump_to(self, message: int) -> None:
+        """Move the cursor to the given message, clamped to the log."""
+        self.cursor = max(0, min(message, self.log_length - 1))
+
+    def scroll_lines(self, lines: int) -> None:
+        """Move the cursor by about `lines` lines, and by at least one message."""
+        if self.wrapped_lines is None or not self.log_length:
+            return
+        bottom_line = self.wrapped_lines.starts[self.cursor + 1] - 1 + lines
+        message = self.wrapped_lines.message_at_line(bottom_line)
+        if lines < 0:
+            message = min(message, self.cursor - 1)
+        else:
+            message = max(message, self.cursor + 1)
+        self.jump_to(message)
+
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[ActionOrHandler]:
         # Fancy conditional movement to make it feel right.
         if event.sym in (tcod.event.KeySym.UP, tcod.event.KeySym.K):
-            self.cursor = max(0, self.cursor - 1)
+            self.jump_to(self.cursor - 1)
         elif event.sym in (tcod.event.KeySym.DOWN, tcod.event.KeySym.J):
-            self.cursor = min(self.log_length - 1, self.cursor + 1)
+            self.jump_to(self.cursor + 1)
+        elif event.sym == tcod.event.KeySym.PAGEUP:
+            self.scroll_lines(-self.page_height)
+        elif event.sym == tcod.event.KeySym.PAGEDOWN:
+            self.scroll_lines(self.page_height)
         elif event.sym == tcod.event.KeySym.HOME:
-            self.cursor = 0
+            self.jump_to(0)
         elif event.sym == tcod.event.KeySym.END:
-            self.cursor = self.log_length - 1
+            self.jump_to(self.log_length - 1)
         else:  # Any other key moves back to the main game state.
             return MainGameEventHandler(self.engine)
         return None
@@ -391,9 +437,11 @@ def __init__(self, engine: game.engine.Engine):
     def on_render(self, console: tcod.console.Console) -> None:
         """Highlight the tile under the cursor."""
         super().on_render(console)
-        x, y = self.engine.mouse_location
-        console.rgb["bg"][x, y] = game.color.white
-        console.rgb["fg"][x, y] = game.color.black
+        camera = self.engine.camera
+        if camera.in_view(*self.engine.mouse_location):
+            x, y = camera.map_to_screen(*self.engine.mouse_location)
+            console.rgb["bg"][x, y] = game.color.white
+            console.rgb["fg"][x, y] = game.color.black
 
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[ActionOrHandler]:
         """Check for key movement or confirmation keys."""
@@ -411,10 +459,10 @@ def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[ActionOrHandler]:
             dx, dy = MOVE_KEYS[key]
             x += dx * modifier
             y += dy * modifier
-            # Clamp the cursor index to the map size.
-            x = max(0, min(x, self.engine.game_map.width - 1))
-            y = max(0, min(y, self.engine.game_map.height - 1))
-            self.engine.mouse_location = x, y
+            # Clamp the cursor index to the part of the map on screen.
+            self.engine.mouse_location = self.engine.camera.clamp(
+                x, y, self.engine.game_map.width, self.engine.game_map.height
+            )
             return None
         elif key in (tcod.event.KeySym.RETURN, tcod.event.KeySym.KP_ENTER):
             return self.on_index_selected(*self.engine.mouse_location)
@@ -422,8 +470,9 @@ def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[ActionOrHandler]:
 
     def ev_mousebuttondown(self, event: tcod.event.MouseButtonDown) -> Optional[ActionOrHandler]:
         """Left click confirms a selection."""
-        x, y = int(event.position.x), int(event.position.y)
-        if self.engine.game_map.in_bounds(x, y):
+        camera = self.engine.camera
+        x, y = camera.screen_to_map(int(event.position.x), int(event.position.y))
+        if camera.in_view(x, y) and self.engine.game_map.in_bounds(x, y):
             if event.button == 1:
                 return self.on_index_selected(x, y)
         return super().ev_mousebuttondown(event)
@@ -470,20 +519,21 @@ def __init__(
         self.callback = callback
 
     def on_render(self, console: tcod.console.Console) -> None:
-        """Highlight the tile under the cursor."""
+        """Highlight the tile under the cursor and the tiles which would be affected around it."""
         super().on_render(console)
 
-        x, y = self.engine.mouse_location
-
-        # Draw a rectangle around the targeted area, so the player can see the affected tiles.
-        console.draw_frame(
-            x=x - self.radius - 1,
-            y=y - self.radius - 1,
-            width=self.radius**2,
-            height=self.radius**2,
-            fg=game.color.red,
-            clear=False,
-        )
+        # Tint the affected area, the same disk the effect uses through `GameMap.get_actors_in_radius`.
+        game_map = self.engine.game_map
+        camera = self.engine.camera
+        cursor_x, cursor_y = self.engine.mouse_location
+        dx, dy = game.stencils.disk_offsets(self.radius)
+        x = dx[1:] + cursor_x  # The first offset is the cursor, which keeps its highlight.
+        y = dy[1:] + cursor_y
+        shown = (x >= camera.x) & (x < camera.x + camera.width) & (y >= camera.y) & (y < camera.y + camera.height)
+        shown &= (x < game_map.width) & (y < game_map.height)
+        x = x[shown] + (camera.screen_x - camera.x)
+        y = y[shown] + (camera.screen_y - camera.y)
+        console.rgb["bg"][x, y] = game.color.area_of_effect
 
     def on_index_selected(self, x: int, y: int) -> Optional[game.actions.Action]:
         return self.callback((x, y))
@@ -1,4 +1,8 @@
-from typing import Generator, List, Reversible, Tuple
+from typing import Deque, Dict, Generator, Iterable, Iterator, List, Optional, Reversible, Tuple
+import bisect
+import collections
+import json
+import os
 import textwrap
 
 import tcod
@@ -10,7 +14,18 @@ class Message:
     def __init__(self, text: str, fg: Tuple[int, int, int]):
         self.plain_text = text
         self.fg = fg
-        self.count = 1
+        self._count = 1
+        self._wrapped: Dict[int, List[str]] = {}  # Wrapped lines of `full_text` by width.
+
+    @property
+    def count(self) -> int:
+        """How many times this message was repeated."""
+        return self._count
+
+    @count.setter
+    def count(self, value: int) -> None:
+        self._count = value
+        self._wrapped.clear()  # The count is part of `full_text`.
 
     @property
     def full_text(self) -> str:
@@ -19,10 +34,64 @@ def full_text(self) -> str:
             return f"{self.plain_text} (x{self.count})"
         return self.plain_text
 
+    def wrapped_lines(self, width: int) -> List[str]:
+        """Return `full_text` wrapped to `width`, the result is cached and must not be modified."""
+        lines = self._wrapped.get(width)
+        if lines is None:
+            lines = self._wrapped[width] = list(MessageLog.wrap(self.full_text, width))
+        return lines
+
+
+class WrappedLines:
+    """The lines of a sequence of messages wrapped to `width`, indexed so that any window of lines can be found quickly.
+
+    `starts[i]` is the line number of the first line of message `i`, with one more entry for the total line count.
+    """
+
+    def __init__(self, messages: Iterable[Message], width: int):
+        self.messages = list(messages)
+        self.width = width
+        self.starts = [0]
+        for message in self.messages:
+            self.starts.append(self.starts[-1] + len(message.wrapped_lines(width)))
+
+    @property
+    def total_lines(self) -> int:
+        return self.starts[-1]
+
+    def message_at_line(self, line: int) -> int:
+        """Return the index of the message which the given line belongs to."""
+        return max(0, min(bisect.bisect_right(self.starts, line) - 1, len(self.messages) - 1))
+
+    def lines(self, start: int, stop: int) -> Iterator[Tuple[str, Tuple[int, int, int]]]:
+        """Yield the (text, color) of each line from `start` up to `stop`."""
+        start = max(start, 0)
+        stop = min(stop, self.total_lines)
+        if start >= stop:
+            return
+        index = self.message_at_line(start)
+        line = self.starts[index]
+        while line < stop:
+            message = self.messages[index]
+            for text in message.wrapped_lines(self.width):
+                if start <= line < stop:
+                    yield text, message.fg
+                line += 1
+            index += 1
+
 
 class MessageLog:
-    def __init__(self) -> None:
-        self.messages: List[Message] = []
+    """The most recent messages of a game.
+
+    At most `max_messages` are kept in memory.  Beyond that the oldest messages are removed in batches and, if
+    `archive_path` is set, appended to that file as JSON lines of `[text, fg, count]`.
+    """
+
+    def __init__(self, *, max_messages: int = 1000, archive_path: Optional[str] = None) -> None:
+        self.messages: Deque[Message] = collections.deque()
+        self.max_messages = max_messages
+        self.archive_path = archive_path
+        self.archived = 0  # Number of messages removed from the start of `messages` so far.
 
     def add_message(
         self,
@@ -42,6 +111,21 @@ def add_message(
             self.messages[-1].count += 1
         else:
             self.messages.append(Message(text, fg))
+            if len(self.messages) > self.max_messages:
+                self.archive(len(self.messages) - self.max_messages + self.max_messages // 10)
+
+    def archive(self, count: int) -> None:
+        """Remove the oldest `count` messages, appending them to `archive_path` if it is set."""
+        removed = [self.messages.popleft() for _ in range(min(count, len(self.messages)))]
+        self.archived += len(removed)
+        if self.archive_path is None:
+            return
+        directory = os.path.dirname(self.archive_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.archive_path, "a", encoding="utf-8") as f:
+            for message in removed:
+                f.write(json.dumps([message.plain_text, message.fg, message.count]) + "\n")
 
     def render(
         self,
@@ -89,7 +173,7 @@ def render_messages(
         y_offset = height - 1
 
         for message in reversed(messages):
-            for line in reversed(list(cls.wrap(message.full_text, width))):
+            for line in reversed(message.wrapped_lines(width)):
                 console.print(x=x, y=y + y_offset, string=line, fg=message.fg)
                 y_offset -= 1
                 if y_offset < 0:
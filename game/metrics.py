@@ -0,0 +1,178 @@
+"""Timing instrumentation for turn phases, player actions, monster AI and rendering.
+
+Timings are only taken while `registry.enabled` is True.  While disabled `timed` returns a shared do-nothing context
+manager, so instrumented code costs a function call and a `with` block.
+"""
+
+from __future__ import annotations
+
+from types import TracebackType
+from typing import ContextManager, Dict, Optional, Type
+import bisect
+import csv
+import json
+import math
+import time
+
+BUCKETS_PER_DECADE = 20
+BUCKET_BOUNDS = [
+    10 ** (exponent / BUCKETS_PER_DECADE) for exponent in range(-7 * BUCKETS_PER_DECADE, 2 * BUCKETS_PER_DECADE)
+]
+"""Upper bounds in seconds of the histogram buckets, from 0.1 microseconds to 100 seconds.
+
+Each bucket is about 12% wider than the last, which bounds the error of a reported percentile.
+"""
+
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """Counts of timings in logarithmic buckets, with their exact total, minimum and maximum."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)  # The last bucket holds anything above the last bound.
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Record a timing."""
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent: float) -> float:
+        """Return the upper bound of the bucket holding the given percentile, clamped to the recorded range."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = BUCKET_BOUNDS[bucket] if bucket < len(BUCKET_BOUNDS) else self.max
+                return min(max(bound, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Return the statistics of this histogram, timings are in seconds."""
+        summary = {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+        }
+        for percent in PERCENTILES:
+            summary[f"p{percent}"] = self.percentile(percent)
+        return summary
+
+
+class _Timer:
+    """Records the time spent in a `with` block."""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(
+        self, exc_type: Optional[Type[BaseException]], exc: Optional[BaseException], tb: Optional[TracebackType]
+    ) -> None:
+        self.histogram.add(time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    """Used in place of `_Timer` while metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(
+        self, exc_type: Optional[Type[BaseException]], exc: Optional[BaseException], tb: Optional[TracebackType]
+    ) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """Named timing histograms.
+
+    Names are dotted paths such as "turn.fov", "action.MeleeAction" or "ai.HostileEnemy".
+    """
+
+    def __init__(self, *, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: Dict[str, Histogram] = {}
+
+    def histogram(self, name: str) -> Histogram:
+        """Return the histogram for `name`, creating it if needed."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def timed(self, *name: str) -> ContextManager[None]:
+        """Return a context manager which records the time spent in it under the name made by joining `name` with dots.
+
+        The parts are only joined while enabled, so callers can pass `type(action).__name__` without a cost.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(".".join(name)))
+
+    def record(self, name: str, seconds: float) -> None:
+        """Record a timing measured elsewhere."""
+        if self.enabled:
+            self.histogram(name).add(seconds)
+
+    def reset(self) -> None:
+        """Forget all recorded timings."""
+        self.histograms.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return the statistics of every histogram by name."""
+        return {name: self.histograms[name].summary() for name in sorted(self.histograms)}
+
+    def dump_json(self, path: str) -> None:
+        """Write the statistics of every histogram to a JSON file, timings are in seconds."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def dump_csv(self, path: str) -> None:
+        """Write the statistics of every histogram to a CSV file with one row per name, timings are in seconds."""
+        columns = ["count", "total", "mean", "min", "max"] + [f"p{percent}" for percent in PERCENTILES]
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name"] + columns)
+            for name, summary in self.summary().items():
+                writer.writerow([name] + [summary[column] for column in columns])
+
+    def dump(self, path: str) -> None:
+        """Write the statistics to `path` as CSV if it ends with ".csv", otherwise as JSON."""
+        if path.lower().endswith(".csv"):
+            self.dump_csv(path)
+        else:
+            self.dump_json(path)
+
+
+registry = MetricsRegistry()
+"""The registry used by the game."""
+
+
+def timed(*name: str) -> ContextManager[None]:
+    """Time a `with` block using the global `registry`, see `MetricsRegistry.timed`."""
+    return registry.timed(*name)
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple
-import copy
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple
 import random
 
+from numpy.typing import NDArray
+import numpy as np
 import tcod
 
 import game.entity_factories
+import game.spawn_tables
 import game.tiles
 
 if TYPE_CHECKING:
@@ -41,41 +43,11 @@
 }
 
 
-def get_max_value_for_floor(weighted_chances_by_floor: List[Tuple[int, int]], floor: int) -> int:
-    current_value = 0
-
-    for floor_minimum, value in weighted_chances_by_floor:
-        if floor_minimum > floor:
-            break
-        else:
-            current_value = value
-
-    return current_value
-
-
-def get_entities_at_random(
-    weighted_chances_by_floor: Dict[int, List[Tuple[game.entity.Entity, int]]],
-    number_of_entities: int,
-    floor: int,
-) -> List[game.entity.Entity]:
-    entity_weighted_chances = {}
-
-    for key, values in weighted_chances_by_floor.items():
-        if key > floor:
-            break
-        else:
-            for value in values:
-                entity = value[0]
-                weighted_chance = value[1]
-
-                entity_weighted_chances[entity] = weighted_chance
-
-    entities = list(entity_weighted_chances.keys())
-    entity_weighted_chance_values = list(entity_weighted_chances.values())
-
-    chosen_entities = random.choices(entities, weights=entity_weighted_chance_values, k=number_of_entities)
-
-    return chosen_entities
+spawn_tables: Dict[str, game.spawn_tables.SpawnTable] = {
+    "monsters": game.spawn_tables.SpawnTable(enemy_chances, max_monsters_by_floor),
+    "items": game.spawn_tables.SpawnTable(item_chances, max_items_by_floor),
+}
+"""The spawn tables used by `generate_dungeon` unless it is given others."""
 
 
 class RectangularRoom:
@@ -102,42 +74,188 @@ def intersects(self, other: RectangularRoom) -> bool:
         return self.x1 <= other.x2 and self.x2 >= other.x1 and self.y1 <= other.y2 and self.y2 >= other.y1
 
 
-def tunnel_between(start: Tuple[int, int], end: Tuple[int, int]) -> Iterator[Tuple[int, int]]:
-    """Return an L-shaped tunnel between these two points."""
-    x1, y1 = start
-    x2, y2 = end
-    if random.random() < 0.5:  # 50% chance.
-        # Move horizontally, then vertically.
-        corner_x, corner_y = x2, y1
-    else:
-        # Move vertically, then horizontally.
-        corner_x, corner_y = x1, y2
-
-    # Generate the coordinates for this tunnel.
-    for x, y in tcod.los.bresenham((x1, y1), (corner_x, corner_y)).tolist():
-        yield x, y
-    for x, y in tcod.los.bresenham((corner_x, corner_y), (x2, y2)).tolist():
-        yield x, y
+class RoomPlacer:
+    """Tracks the space claimed by rooms on a map so that new rooms can be checked and placed without a scan of them.
+
+    A room claims its whole rectangle including its walls, so a room fits exactly when it would not `intersect` any
+    claimed room.  Rooms are placed with their top-left corner at most at `(width - room_width - 1,
+    height - room_height - 1)`, the same range as the random candidates in `generate_dungeon`.
+    """
+
+    PROBES = 64
+    """Random positions to try at once in `sample` before listing every free position."""
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.claimed = np.zeros((width, height), dtype=bool, order="F")
+        # Where rooms of a (width, height) fit, indexed by the top-left corner.  Only made for sizes given to `sample`,
+        # then kept up to date by `claim`.
+        self._fits_by_size: Dict[Tuple[int, int], NDArray[np.bool_]] = {}
+        # Made by the first `sample` and seeded from `random`, so that results are repeatable.
+        self._rng: Optional[np.random.Generator] = None
+
+    def fits(self, room: RectangularRoom) -> bool:
+        """Return True if `room` is inside the map and does not overlap any claimed room."""
+        if room.x1 < 0 or room.y1 < 0 or room.x2 >= self.width or room.y2 >= self.height:
+            return False
+        return not self.claimed[room.x1 : room.x2 + 1, room.y1 : room.y2 + 1].any()
+
+    def claim(self, room: RectangularRoom) -> None:
+        """Mark the area of `room` as taken."""
+        self.claimed[room.x1 : room.x2 + 1, room.y1 : room.y2 + 1] = True
+        for (width, height), fits in self._fits_by_size.items():
+            # Corners whose room would reach into this one.
+            fits[max(0, room.x1 - width) : room.x2 + 1, max(0, room.y1 - height) : room.y2 + 1] = False
+
+    def _fits_for_size(self, width: int, height: int) -> NDArray[np.bool_]:
+        """Return where rooms of the given size fit, computing it from `claimed` the first time a size is asked for."""
+        fits = self._fits_by_size.get((width, height))
+        if fits is None:
+            # Summed-area table of `claimed`, padded with a leading zero row and column.
+            table = np.zeros((self.width + 1, self.height + 1), dtype=np.int32)
+            table[1:, 1:] = self.claimed.cumsum(axis=0).cumsum(axis=1)
+            # Claimed cells within each room rectangle, for every corner in range.
+            x_count = max(0, self.width - width)
+            y_count = max(0, self.height - height)
+            claimed = (
+                table[width + 1 : width + 1 + x_count, height + 1 : height + 1 + y_count]
+                - table[:x_count, height + 1 : height + 1 + y_count]
+                - table[width + 1 : width + 1 + x_count, :y_count]
+                + table[:x_count, :y_count]
+            )
+            fits = self._fits_by_size[width, height] = claimed == 0
+        return fits
+
+    def sample(self, width: int, height: int) -> Optional[RectangularRoom]:
+        """Return a room of the given size at a random free position, or None if it fits nowhere."""
+        fits = self._fits_for_size(width, height)
+        if not fits.size:
+            return None
+        if self._rng is None:
+            self._rng = np.random.default_rng(random.getrandbits(64))
+        x_count, y_count = fits.shape
+        probe_x = self._rng.integers(x_count, size=self.PROBES)
+        probe_y = self._rng.integers(y_count, size=self.PROBES)
+        hits = fits[probe_x, probe_y].nonzero()[0]
+        if hits.size:
+            return RectangularRoom(int(probe_x[hits[0]]), int(probe_y[hits[0]]), width, height)
+        # Mostly claimed, pick from the full list instead.
+        free = np.flatnonzero(fits)
+        if not free.size:
+            return None
+        x, y = np.unravel_index(free[self._rng.integers(free.size)], fits.shape)
+        return RectangularRoom(int(x), int(y), width, height)
+
+
+class TunnelCarver:
+    """Collects the tunnels of a floor so that they can all be dug out with a single write to the tiles array.
+
+    Straight tunnels are kept as segments and expanded into tile indexes with NumPy, other shapes are kept as arrays
+    of their tiles.  Tunnels may overlap each other and rooms.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self._segments: List[Tuple[int, int, int, int]] = []  # (x1, y1, x2, y2) of horizontal or vertical tunnels.
+        self._paths: List[NDArray[np.intc]] = []  # (n, 2) arrays of the tiles of other tunnels.
+
+    def add_straight(self, start: Tuple[int, int], end: Tuple[int, int]) -> None:
+        """Add a horizontal or vertical tunnel from `start` to `end`, including both ends."""
+        x1, y1 = start
+        x2, y2 = end
+        assert x1 == x2 or y1 == y2, "Straight tunnels must be horizontal or vertical."
+        self._segments.append((min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)))
+
+    def add_l_shaped(self, start: Tuple[int, int], end: Tuple[int, int]) -> None:
+        """Add an L-shaped tunnel between these two points, turning at a random one of the two possible corners."""
+        x1, y1 = start
+        x2, y2 = end
+        if random.random() < 0.5:  # 50% chance.
+            # Move horizontally, then vertically.
+            corner_x, corner_y = x2, y1
+        else:
+            # Move vertically, then horizontally.
+            corner_x, corner_y = x1, y2
+        self.add_straight((x1, y1), (corner_x, corner_y))
+        self.add_straight((corner_x, corner_y), (x2, y2))
+
+    def add_line(self, start: Tuple[int, int], end: Tuple[int, int]) -> None:
+        """Add a tunnel following the Bresenham line between these two points."""
+        self._paths.append(tcod.los.bresenham(start, end))
+
+    def add_drunkards_walk(self, start: Tuple[int, int], steps: int) -> None:
+        """Add a tunnel wandering `steps` random cardinal steps from `start`, kept off the edges of the map."""
+        rng = np.random.default_rng(random.getrandbits(64))  # Seeded from `random` so that results are repeatable.
+        directions = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.intc)
+        path = np.empty((steps + 1, 2), dtype=np.intc)
+        path[0] = start
+        np.cumsum(directions[rng.integers(4, size=steps)], axis=0, out=path[1:])
+        path[1:] += path[0]
+        np.clip(path[:, 0], 1, self.width - 2, out=path[:, 0])
+        np.clip(path[:, 1], 1, self.height - 2, out=path[:, 1])
+        self._paths.append(path)
+
+    def indexes(self) -> Tuple[NDArray[np.intp], NDArray[np.intp]]:
+        """Return the x and y indexes of every tile of the collected tunnels, some tiles may be repeated."""
+        xs = [path[:, 0].astype(np.intp) for path in self._paths]
+        ys = [path[:, 1].astype(np.intp) for path in self._paths]
+        if self._segments:
+            x1, y1, x2, y2 = np.array(self._segments, dtype=np.intp).T
+            lengths = (x2 - x1) + (y2 - y1) + 1  # Segments only extend along one axis.
+            # Offset of each tile from the start of its segment.
+            offsets = np.arange(lengths.sum(), dtype=np.intp) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            horizontal = np.repeat(y1 == y2, lengths)
+            xs.append(np.repeat(x1, lengths) + np.where(horizontal, offsets, 0))
+            ys.append(np.repeat(y1, lengths) + np.where(horizontal, 0, offsets))
+        if not xs:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        return np.concatenate(xs), np.concatenate(ys)
+
+    def carve(self, tiles: NDArray[Any], tile: NDArray[Any]) -> None:
+        """Set every tile of the collected tunnels to `tile`, then forget them."""
+        # Copying raw bytes is much faster than assigning a structured value to each index.
+        raw_dtype = np.dtype((np.void, tiles.dtype.itemsize))
+        tiles.view(raw_dtype)[self.indexes()] = np.asarray(tile, dtype=tiles.dtype).view(raw_dtype)
+        self._segments.clear()
+        self._paths.clear()
 
 
 def place_entities(
-    room: RectangularRoom,
+    rooms: Sequence[RectangularRoom],
     dungeon: game.game_map.GameMap,
     floor_number: int,
+    tables: Mapping[str, game.spawn_tables.SpawnTable],
 ) -> None:
-    number_of_monsters = random.randint(0, get_max_value_for_floor(max_monsters_by_floor, floor_number))
-    number_of_items = random.randint(0, get_max_value_for_floor(max_items_by_floor, floor_number))
-
-    monsters: List[game.entity.Entity] = get_entities_at_random(enemy_chances, number_of_monsters, floor_number)
-    items: List[game.entity.Entity] = get_entities_at_random(item_chances, number_of_items, floor_number)
-
-    for entity in monsters + items:
-        x = random.randint(room.x1 + 1, room.x2 - 1)
-        y = random.randint(room.y1 + 1, room.y2 - 1)
-
-        if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
-            entity_copy = copy.deepcopy(entity)
-            entity_copy.place(x, y, dungeon)
+    """Spawn the monsters and items of every room of a floor.
+
+    The random numbers for the whole floor are drawn at once.  Entities which would land on an occupied tile or on the
+    upstairs location are skipped.
+    """
+    rng = np.random.default_rng(random.getrandbits(64))  # Seeded from `random` so that results are repeatable.
+    room_x1 = np.array([room.x1 for room in rooms], dtype=np.intp)
+    room_y1 = np.array([room.y1 for room in rooms], dtype=np.intp)
+    room_x2 = np.array([room.x2 for room in rooms], dtype=np.intp)
+    room_y2 = np.array([room.y2 for room in rooms], dtype=np.intp)
+
+    prototypes: List[game.entity.Entity] = []
+    room_indexes: List[NDArray[np.intp]] = []
+    for kind in ("monsters", "items"):  # Monsters first, so that they get the first pick of the tiles.
+        table = tables[kind]
+        counts = rng.integers(0, table.max_for_floor(floor_number), size=len(rooms), endpoint=True)
+        floor_table = table.for_floor(floor_number)
+        prototypes += [floor_table.prototypes[pick] for pick in floor_table.sample(rng, int(counts.sum())).tolist()]
+        room_indexes.append(np.repeat(np.arange(len(rooms)), counts))
+    room_of = np.concatenate(room_indexes)
+    xs = rng.integers(room_x1[room_of] + 1, room_x2[room_of] - 1, endpoint=True)
+    ys = rng.integers(room_y1[room_of] + 1, room_y2[room_of] - 1, endpoint=True)
+
+    for prototype, x, y in zip(prototypes, xs.tolist(), ys.tolist()):
+        if (x, y) == dungeon.upstairs_location:
+            continue  # Keep the arrival point free, the player might not be placed yet.
+        if not dungeon.get_entities_at_location(x, y):
+            game.entity_factories.spawn(prototype).place(x, y, dungeon)
 
 
 def generate_dungeon(
@@ -147,13 +265,28 @@ def generate_dungeon(
     map_width: int,
     map_height: int,
     current_floor: int,
-    engine: game.engine.Engine,
+    engine: Optional[game.engine.Engine],
+    *,
+    resample_rejected: bool = False,
+    tables: Optional[Mapping[str, game.spawn_tables.SpawnTable]] = None,
 ) -> game.game_map.GameMap:
-    """Generate a new dungeon map."""
-    player = engine.player
+    """Generate a new dungeon map.
+
+    If `engine` is None then the map is returned without an engine and without the player, who should later be placed
+    at the maps `upstairs_location`.
+
+    Each of the `max_rooms` attempts picks a random room which is skipped if it overlaps an earlier room.  If
+    `resample_rejected` is True then such a room is moved to a random free position instead, so that attempts are
+    only wasted once the map has no space left for a room of that size.
+
+    Monsters and items are chosen from the "monsters" and "items" entries of `tables`, by default `spawn_tables`.
+    """
     dungeon = game.game_map.GameMap(engine, map_width, map_height)
+    dungeon.has_upstairs = current_floor > 1
 
     rooms: List[RectangularRoom] = []
+    placer = RoomPlacer(dungeon.width, dungeon.height)
+    tunnels = TunnelCarver(dungeon.width, dungeon.height)
 
     for _ in range(max_rooms):
         room_width = random.randint(room_min_size, room_max_size)
@@ -165,28 +298,71 @@ def generate_dungeon(
         # "RectangularRoom" class makes rectangles easier to work with
         new_room = RectangularRoom(x, y, room_width, room_height)
 
-        # Run through the other rooms and see if they intersect with this one.
-        if any(new_room.intersects(other_room) for other_room in rooms):
-            continue  # This room intersects, so go to the next attempt.
+        # Check the space claimed by the other rooms to see if they intersect with this one.
+        if not placer.fits(new_room):
+            if not resample_rejected:
+                continue  # This room intersects, so go to the next attempt.
+            resampled_room = placer.sample(room_width, room_height)
+            if resampled_room is None:
+                continue  # There is no space left for a room of this size.
+            new_room = resampled_room
         # If there are no intersections then the room is valid.
+        placer.claim(new_room)
 
         # Dig out this rooms inner area.
         dungeon.tiles[new_room.inner] = game.tiles.floor
 
         if len(rooms) == 0:
             # The first room, where the player starts.
-            player.place(*new_room.center, dungeon)
+            dungeon.upstairs_location = new_room.center
+            if engine is not None:
+                engine.player.place(*new_room.center, dungeon)
         else:  # All rooms after the first.
-            # Dig out a tunnel between this room and the previous one.
-            for x, y in tunnel_between(rooms[-1].center, new_room.center):
-                dungeon.tiles[x, y] = game.tiles.floor
-
-        place_entities(new_room, dungeon, current_floor)
+            # Plan a tunnel between this room and the previous one, all tunnels are dug out together at the end.
+            tunnels.add_l_shaped(rooms[-1].center, new_room.center)
 
         # Finally, append the new room to the list.
         rooms.append(new_room)
 
+    tunnels.carve(dungeon.tiles, game.tiles.floor)
+    place_entities(rooms, dungeon, current_floor, spawn_tables if tables is None else tables)
+
     # Add stairs going down
     dungeon.downstairs_location = rooms[-1].center
 
     return dungeon
+
+
+def generate_detached_dungeon(
+    seed: int,
+    max_rooms: int,
+    room_min_size: int,
+    room_max_size: int,
+    map_width: int,
+    map_height: int,
+    current_floor: int,
+    *,
+    resample_rejected: bool = False,
+    spawn_tables_path: Optional[str] = None,
+) -> game.game_map.GameMap:
+    """Generate a new dungeon map from `seed` without an engine, this can be run in a worker process.
+
+    The global random state is left as it was, so the result only depends on the seed.  If `spawn_tables_path` is
+    given then the spawn tables are loaded from that file, see `game.spawn_tables`.
+    """
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        return generate_dungeon(
+            max_rooms=max_rooms,
+            room_min_size=room_min_size,
+            room_max_size=room_max_size,
+            map_width=map_width,
+            map_height=map_height,
+            current_floor=current_floor,
+            engine=None,
+            resample_rejected=resample_rejected,
+            tables=None if spawn_tables_path is None else game.spawn_tables.load_spawn_tables(spawn_tables_path),
+        )
+    finally:
+        random.setstate(state)
@@ -0,0 +1,68 @@
+"""Turn order of actors with different speeds."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple
+import heapq
+import itertools
+
+if TYPE_CHECKING:
+    import game.entity
+
+NORMAL_SPEED = 100
+"""The speed of an actor which acts once per turn of the player at normal speed."""
+
+TURN_TIME = 100
+"""Game time taken by an action at `NORMAL_SPEED`."""
+
+
+def action_time(speed: int) -> int:
+    """Return the game time an action takes at `speed`, faster actors take less time and act more often."""
+    return max(1, TURN_TIME * NORMAL_SPEED // max(1, speed))
+
+
+class TurnScheduler:
+    """A queue of actors ordered by the game time of their next action.
+
+    Actors which are due at the same time act in the order they were scheduled.  Each actor is in the queue at most
+    once, scheduling it again moves it.  Actors which are not in the queue cost nothing, see `Engine.handle_enemy_turns`.
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[int, int, game.entity.Actor]] = []  # (time, sequence, actor), may hold stale entries.
+        self._entries: Dict[game.entity.Actor, Tuple[int, int]] = {}  # The current (time, sequence) of each actor.
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, actor: game.entity.Actor) -> bool:
+        return actor in self._entries
+
+    def schedule(self, actor: game.entity.Actor, time: int) -> None:
+        """Queue `actor` to act at `time`, replacing any earlier time it was queued for."""
+        entry = self._entries[actor] = time, next(self._sequence)
+        heapq.heappush(self._heap, (*entry, actor))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+
+    def unschedule(self, actor: game.entity.Actor) -> None:
+        """Remove `actor` from the queue if it is in it."""
+        self._entries.pop(actor, None)
+
+    def pop_due(self, time: int) -> Iterator[Tuple[int, game.entity.Actor]]:
+        """Remove and yield `(due_time, actor)` for the actors due to act at or before `time`, in order.
+
+        Actors scheduled while iterating are yielded too if they are due by `time`.
+        """
+        while self._heap and self._heap[0][0] <= time:  # `schedule` may replace the heap while iterating.
+            due_time, sequence, actor = heapq.heappop(self._heap)
+            if self._entries.get(actor) != (due_time, sequence):
+                continue  # Rescheduled or removed since this entry was pushed.
+            del self._entries[actor]
+            yield due_time, actor
+
+    def _compact(self) -> None:
+        """Drop stale entries from the heap."""
+        self._heap = [(time, sequence, actor) for actor, (time, sequence) in self._entries.items()]
+        heapq.heapify(self._heap)
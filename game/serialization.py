@@ -0,0 +1,545 @@
+"""Structured save files.
+
+A save file is a small JSON header followed by independent sections.  Map layers are stored as raw NumPy buffers,
+entities as a table of prototype ids plus their per-instance fields, and other data as JSON.  Each section can be
+compressed on its own, uncompressed array sections can be memory-mapped when loading.
+
+Layout::
+
+    MAGIC, header length (uint32 little-endian), header JSON, padding, section data...
+
+Section offsets in the header are relative to the start of the section data, which is aligned to `ALIGNMENT` bytes
+like every section.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import json
+import lzma
+import os
+import struct
+import zlib
+
+from numpy.typing import NDArray
+import numpy as np
+
+import game.bit_grid
+import game.components.ai
+import game.engine
+import game.entity
+import game.entity_factories
+import game.game_map
+import game.message_log
+import game.render_order
+
+MAGIC = b"RLSAVE\x00\x01"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+COMPRESSIONS = ("none", "zlib", "lzma")
+"""Supported section compressions.  "zlib" is the fast option, "lzma" is the smallest."""
+
+AI_NONE = 0
+AI_HOSTILE = 1
+AI_CONFUSED = 2
+
+EQUIPPED_NONE = 0
+EQUIPPED_WEAPON = 1
+EQUIPPED_ARMOR = 2
+
+entity_dt = np.dtype(
+    [
+        ("prototype", np.uint16),  # Index into the "entities.prototypes" section.
+        ("floor", np.int32),  # Floor the entity is on, or -1 if it is held in an inventory.
+        ("holder", np.int32),  # Row of the actor holding this item in its inventory, or -1.
+        ("equipped", np.uint8),  # One of the EQUIPPED_* constants.
+        ("x", np.int32),
+        ("y", np.int32),
+        ("char", np.int32),  # Unicode codepoint.
+        ("color", np.uint8, 3),
+        ("blocks_movement", bool),
+        ("render_order", np.uint8),
+        ("hp", np.int32),
+        ("max_hp", np.int32),
+        ("base_defense", np.int32),
+        ("base_power", np.int32),
+        ("current_level", np.int32),
+        ("current_xp", np.int32),
+        ("speed", np.int32),  # Missing from older saves, whose actors keep the speed of their prototype.
+        ("ai", np.uint8),  # One of the AI_* constants.
+        ("previous_ai", np.uint8),  # AI to restore once a confused actor recovers.
+        ("ai_turns", np.int32),  # Turns of confusion remaining.
+    ]
+)
+"""Table row for a single entity, fields not in this table are taken from the entities prototype."""
+
+
+class Section(NamedTuple):
+    """A section of a save file before compression."""
+
+    meta: Dict[str, Any]  # Describes how to decode `data`, stored in the header.
+    data: bytes
+
+
+Sections = Dict[str, Section]
+
+
+def array_section(array: NDArray[Any]) -> Section:
+    """Return a section holding a copy of a NumPy array."""
+    meta = {
+        "kind": "array",
+        "dtype": np.lib.format.dtype_to_descr(array.dtype),
+        "shape": list(array.shape),
+    }
+    return Section(meta, array.tobytes(order="F"))
+
+
+def json_section(obj: Any) -> Section:
+    """Return a section holding a JSON compatible object."""
+    return Section({"kind": "json"}, json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.compress(data, 1)
+    if compression == "lzma":
+        return lzma.compress(data)
+    return data
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.decompress(data)
+    if compression == "lzma":
+        return lzma.decompress(data)
+    return data
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_sections(path: str, sections: Sections, compression: str = "zlib") -> None:
+    """Compress `sections` and write them to `path`.
+
+    The file is written to a temporary path first and then moved into place, so an existing save is never left half
+    written.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}, expected one of {COMPRESSIONS}.")
+    header_sections: Dict[str, Dict[str, Any]] = {}
+    payloads: List[Tuple[int, bytes]] = []
+    offset = 0
+    for name, (meta, data) in sections.items():
+        payload = _compress(data, compression)
+        offset = _align(offset)
+        header_sections[name] = {**meta, "offset": offset, "length": len(payload), "compression": compression}
+        payloads.append((offset, payload))
+        offset += len(payload)
+    header = json.dumps({"version": FORMAT_VERSION, "sections": header_sections}).encode("utf-8")
+    prefix = MAGIC + struct.pack("<I", len(header)) + header
+    data_start = _align(len(prefix))
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(prefix)
+        for section_offset, payload in payloads:
+            f.seek(data_start + section_offset)
+            f.write(payload)
+    os.replace(temp_path, path)
+
+
+def is_save_file(path: str) -> bool:
+    """Return True if `path` is in this save format rather than the older pickled format."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class SaveFile:
+    """Read access to the sections of a save file.
+
+    If `mmap` is True then uncompressed array sections are memory-mapped copy-on-write instead of being read.  The file
+    will be kept open for as long as those arrays are alive.
+    """
+
+    def __init__(self, path: str, *, mmap: bool = False):
+        self.path = path
+        self.mmap = mmap
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a save file.")
+            (header_length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_length))
+            if header["version"] > FORMAT_VERSION:
+                raise ValueError(f"{path} was saved by a newer version of this game.")
+            self.sections: Dict[str, Dict[str, Any]] = header["sections"]
+            self.data_start = _align(len(MAGIC) + 4 + header_length)
+            self._data: Optional[bytes] = None  # Everything after the header, unless memory-mapping.
+            if not mmap:
+                f.seek(self.data_start)
+                self._data = f.read()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sections
+
+    def _read(self, meta: Dict[str, Any]) -> bytes:
+        if self._data is not None:
+            return self._data[meta["offset"] : meta["offset"] + meta["length"]]
+        with open(self.path, "rb") as f:
+            f.seek(self.data_start + meta["offset"])
+            return f.read(meta["length"])
+
+    def array(self, name: str) -> NDArray[Any]:
+        """Return the array stored in a section."""
+        meta = self.sections[name]
+        dtype = np.lib.format.descr_to_dtype(meta["dtype"])
+        shape = tuple(meta["shape"])
+        if self.mmap and meta["compression"] == "none":
+            mapped: NDArray[Any] = np.memmap(
+                self.path, dtype=dtype, mode="c", offset=self.data_start + meta["offset"], shape=shape, order="F"
+            )
+            return mapped
+        data = bytearray(_decompress(self._read(meta), meta["compression"]))
+        return np.frombuffer(data, dtype=dtype).reshape(shape, order="F")
+
+    def json(self, name: str) -> Any:
+        """Return the object stored in a JSON section."""
+        meta = self.sections[name]
+        return json.loads(_decompress(self._read(meta), meta["compression"]))
+
+
+def _ai_kind(ai: Optional[game.components.ai.BaseAI]) -> int:
+    if ai is None:
+        return AI_NONE
+    if isinstance(ai, game.components.ai.ConfusedEnemy):
+        return AI_CONFUSED
+    if isinstance(ai, game.components.ai.HostileEnemy):
+        return AI_HOSTILE
+    raise TypeError(f"Can not save AI of type {type(ai).__name__}.")
+
+
+def _new_ai(kind: int, entity: game.entity.Actor) -> Optional[game.components.ai.BaseAI]:
+    if kind == AI_NONE:
+        return None
+    if kind == AI_HOSTILE:
+        return game.components.ai.HostileEnemy(entity)
+    raise ValueError(f"Unexpected AI kind {kind}.")
+
+
+class _EntityTableWriter:
+    """Collects entities into the rows of an entity table."""
+
+    def __init__(self) -> None:
+        self.entities: List[game.entity.Entity] = []
+        self.floors: List[int] = []
+        self.holders: List[int] = []
+        self.equipped: List[int] = []
+        self.rows: Dict[int, int] = {}  # Row of each entity by id().
+
+    def add(self, entity: game.entity.Entity, *, floor: int = -1, holder: int = -1, equipped: int = 0) -> int:
+        """Add an entity and everything in its inventory, returning its row."""
+        row = len(self.entities)
+        self.rows[id(entity)] = row
+        self.entities.append(entity)
+        self.floors.append(floor)
+        self.holders.append(holder)
+        self.equipped.append(equipped)
+        if isinstance(entity, game.entity.Actor):
+            for item in entity.inventory.items:
+                if item is entity.equipment.weapon:
+                    item_equipped = EQUIPPED_WEAPON
+                elif item is entity.equipment.armor:
+                    item_equipped = EQUIPPED_ARMOR
+                else:
+                    item_equipped = EQUIPPED_NONE
+                self.add(item, holder=row, equipped=item_equipped)
+        return row
+
+    def sections(self) -> Sections:
+        """Return the entity table and its side sections."""
+        prototype_ids: List[str] = []
+        prototype_index: Dict[str, int] = {}
+        table = np.zeros(len(self.entities), dtype=entity_dt)
+        names: List[str] = []
+        paths: Dict[str, List[Tuple[int, int]]] = {}
+        for row, entity in enumerate(self.entities):
+            if entity.prototype_id is None:
+                raise ValueError(f"{entity.name} was not created from a prototype and can not be saved.")
+            if entity.prototype_id not in prototype_index:
+                prototype_index[entity.prototype_id] = len(prototype_ids)
+                prototype_ids.append(entity.prototype_id)
+            record = table[row]
+            record["prototype"] = prototype_index[entity.prototype_id]
+            record["floor"] = self.floors[row]
+            record["holder"] = self.holders[row]
+            record["equipped"] = self.equipped[row]
+            record["x"] = entity.x
+            record["y"] = entity.y
+            record["char"] = ord(entity.char)
+            record["color"] = entity.color
+            record["blocks_movement"] = entity.blocks_movement
+            record["render_order"] = entity.render_order.value
+            names.append(entity.name)
+            if isinstance(entity, game.entity.Actor):
+                record["hp"] = entity.fighter.hp
+                record["max_hp"] = entity.fighter.max_hp
+                record["base_defense"] = entity.fighter.base_defense
+                record["base_power"] = entity.fighter.base_power
+                record["current_level"] = entity.level.current_level
+                record["current_xp"] = entity.level.current_xp
+                record["speed"] = entity.speed
+                ai = entity.ai
+                record["ai"] = _ai_kind(ai)
+                if isinstance(ai, game.components.ai.ConfusedEnemy):
+                    record["previous_ai"] = _ai_kind(ai.previous_ai)
+                    record["ai_turns"] = ai.turns_remaining
+                elif isinstance(ai, game.components.ai.HostileEnemy) and ai.path:
+                    paths[str(row)] = ai.path
+        return {
+            "entities": array_section(table),
+            "entities.prototypes": json_section(prototype_ids),
+            "entities.names": json_section(names),
+            "entities.paths": json_section(paths),
+        }
+
+
+def _read_entities(save: SaveFile) -> Tuple[NDArray[Any], List[game.entity.Entity]]:
+    """Return the entity table and the entities restored from it, not yet placed anywhere."""
+    table = save.array("entities")
+    prototype_ids: List[str] = save.json("entities.prototypes")
+    names: List[str] = save.json("entities.names")
+    paths: Dict[str, List[List[int]]] = save.json("entities.paths")
+    prototypes = [game.entity_factories.prototypes[prototype_id] for prototype_id in prototype_ids]
+
+    records: List[Dict[str, Any]] = [dict(zip(table.dtype.fields or (), record)) for record in table.tolist()]
+    entities: List[game.entity.Entity] = []
+    for row, fields in enumerate(records):
+        entity = game.entity_factories.spawn(prototypes[fields["prototype"]])
+        entity.x = fields["x"]
+        entity.y = fields["y"]
+        entity.char = chr(fields["char"])
+        entity.color = tuple(fields["color"])  # type: ignore[assignment]
+        entity.name = names[row]
+        entity.blocks_movement = fields["blocks_movement"]
+        entity.render_order = game.render_order.RenderOrder(fields["render_order"])
+        if isinstance(entity, game.entity.Actor):
+            entity.fighter.max_hp = fields["max_hp"]
+            entity.fighter._hp = fields["hp"]
+            entity.fighter.base_defense = fields["base_defense"]
+            entity.fighter.base_power = fields["base_power"]
+            entity.level.current_level = fields["current_level"]
+            entity.level.current_xp = fields["current_xp"]
+            if "speed" in fields:
+                entity.speed = fields["speed"]
+            if fields["ai"] == AI_CONFUSED:
+                entity.ai = game.components.ai.ConfusedEnemy(
+                    entity, _new_ai(fields["previous_ai"], entity), fields["ai_turns"]
+                )
+            else:
+                entity.ai = _new_ai(fields["ai"], entity)
+            if isinstance(entity.ai, game.components.ai.HostileEnemy):
+                entity.ai.path = [(x, y) for x, y in paths.get(str(row), [])]
+        entities.append(entity)
+
+    for row, fields in enumerate(records):
+        if fields["holder"] < 0:
+            continue
+        holder = entities[fields["holder"]]
+        item = entities[row]
+        assert isinstance(holder, game.entity.Actor) and isinstance(item, game.entity.Item)
+        item.parent = holder.inventory
+        holder.inventory.items.append(item)
+        if fields["equipped"] == EQUIPPED_WEAPON:
+            holder.equipment.equip_to_slot("weapon", item, add_message=False)
+        elif fields["equipped"] == EQUIPPED_ARMOR:
+            holder.equipment.equip_to_slot("armor", item, add_message=False)
+    return table, entities
+
+
+def _floor_sections(floor: int, game_map: game.game_map.GameMap) -> Sections:
+    prefix = f"floor.{floor}"
+    # Maps only use a handful of distinct tiles, so store each distinct tile once and a small index per position.
+    # Tiles are compared as raw bytes, which is much faster than comparing structured values.
+    tile_bytes = game_map.tiles.ravel(order="F").view(np.dtype((np.void, game_map.tiles.dtype.itemsize)))
+    unique_tiles, tiles = np.unique(tile_bytes, return_inverse=True)
+    tile_types = unique_tiles.view(game_map.tiles.dtype)
+    tiles = tiles.reshape(game_map.tiles.shape, order="F")
+    return {
+        f"{prefix}.tile_types": array_section(tile_types),
+        f"{prefix}.tiles": array_section(tiles.astype(np.uint8 if len(tile_types) <= 0x100 else np.uint16)),
+        # Visible and explored tiles are stored packed 8 to a byte, see `game.bit_grid.BitGrid`.
+        f"{prefix}.visible": array_section(game.bit_grid.packed_words(game_map.visible)),
+        f"{prefix}.explored": array_section(game.bit_grid.packed_words(game_map.explored)),
+        f"{prefix}.meta": json_section(
+            {
+                "width": game_map.width,
+                "height": game_map.height,
+                "downstairs_location": game_map.downstairs_location,
+                "upstairs_location": game_map.upstairs_location,
+                "has_upstairs": game_map.has_upstairs,
+                "transparency_version": game_map.transparency_version,
+            }
+        ),
+    }
+
+
+def _read_bool_layer(save: SaveFile, name: str, game_map: game.game_map.GameMap) -> game.bit_grid.BoolLayer:
+    """Return a visible or explored layer, unpacking it unless `GameMap.use_bit_layers` is set."""
+    array = save.array(name)
+    if array.dtype == np.bool_:  # Saved before layers were packed.
+        return game.bit_grid.BitGrid.from_bools(array) if game_map.use_bit_layers else array
+    layer = game.bit_grid.BitGrid(game_map.width, game_map.height, array)
+    return layer if game_map.use_bit_layers else np.asfortranarray(layer.unpack())
+
+
+def _read_floor(save: SaveFile, floor: int) -> game.game_map.GameMap:
+    """Return the map of a floor without its entities or an engine."""
+    prefix = f"floor.{floor}"
+    meta = save.json(f"{prefix}.meta")
+    game_map = game.game_map.GameMap(None, meta["width"], meta["height"])
+    game_map.tiles = np.asfortranarray(save.array(f"{prefix}.tile_types")[save.array(f"{prefix}.tiles")])
+    game_map.visible = _read_bool_layer(save, f"{prefix}.visible", game_map)
+    game_map.explored = _read_bool_layer(save, f"{prefix}.explored", game_map)
+    game_map.downstairs_location = tuple(meta["downstairs_location"])  # type: ignore[assignment]
+    game_map.upstairs_location = tuple(meta["upstairs_location"])  # type: ignore[assignment]
+    game_map.has_upstairs = meta["has_upstairs"]
+    game_map.transparency_version = meta["transparency_version"]
+    return game_map
+
+
+def _place_floor_entities(
+    table: NDArray[Any], entities: List[game.entity.Entity], maps: Dict[int, game.game_map.GameMap]
+) -> None:
+    for entity, floor in zip(entities, table["floor"].tolist()):
+        if floor >= 0:
+            entity.place(entity.x, entity.y, maps[floor])
+
+
+def encode_engine(engine: game.engine.Engine) -> Sections:
+    """Return the sections of a save file for `engine`.
+
+    This only copies data out of the engine and does not compress anything, so that the slow part of saving can be
+    done elsewhere with `write_sections`.
+    """
+    world = engine.game_world
+    sections: Sections = {}
+    entity_table = _EntityTableWriter()
+    for floor, game_map in world.resident_floors.items():
+        sections.update(_floor_sections(floor, game_map))
+        for entity in game_map.entities:
+            entity_table.add(entity, floor=floor)
+    sections.update(entity_table.sections())
+    sections["messages"] = json_section(
+        [[message.plain_text, message.fg, message.count] for message in engine.message_log.messages]
+    )
+    sections["engine"] = json_section(
+        {
+            "player": entity_table.rows[id(engine.player)],
+            "mouse_location": engine.mouse_location,
+            "turn": engine.turn,
+            "message_log": {
+                "max_messages": engine.message_log.max_messages,
+                "archive_path": engine.message_log.archive_path,
+                "archived": engine.message_log.archived,
+            },
+            "world": {
+                "map_width": world.map_width,
+                "map_height": world.map_height,
+                "max_rooms": world.max_rooms,
+                "room_min_size": world.room_min_size,
+                "room_max_size": world.room_max_size,
+                "resample_rejected_rooms": world.resample_rejected_rooms,
+                "spawn_tables_path": world.spawn_tables_path,
+                "current_floor": world.current_floor,
+                "pregenerate": world.pregenerate,
+                "max_resident_floors": world.max_resident_floors,
+                "floor_directory": world.floor_directory,
+                "seed": world.seed,
+                "resident_floors": list(world.resident_floors),
+                "spilled_floors": sorted(world.spilled_floors.items()),
+            },
+        }
+    )
+    return sections
+
+
+def save_engine(engine: game.engine.Engine, path: str, *, compression: str = "zlib") -> None:
+    """Save `engine` to `path`."""
+    write_sections(path, encode_engine(engine), compression)
+
+
+def load_engine(path: str, *, mmap: bool = False) -> game.engine.Engine:
+    """Load an Engine saved with `save_engine`."""
+    save = SaveFile(path, mmap=mmap)
+    meta = save.json("engine")
+    world_meta = meta["world"]
+
+    table, entities = _read_entities(save)
+    player = entities[meta["player"]]
+    assert isinstance(player, game.entity.Actor)
+
+    engine = game.engine.Engine(player=player)
+    engine.mouse_location = tuple(meta["mouse_location"])  # type: ignore[assignment]
+    engine.turn = meta["turn"]
+    if "message_log" in meta:  # Missing from saves made before the message log was bounded.
+        engine.message_log.max_messages = meta["message_log"]["max_messages"]
+        engine.message_log.archive_path = meta["message_log"]["archive_path"]
+        engine.message_log.archived = meta["message_log"]["archived"]
+    for text, fg, count in save.json("messages"):
+        message = game.message_log.Message(text, tuple(fg))  # type: ignore[arg-type]
+        message.count = count
+        engine.message_log.messages.append(message)
+
+    world = game.game_map.GameWorld(
+        engine=engine,
+        map_width=world_meta["map_width"],
+        map_height=world_meta["map_height"],
+        max_rooms=world_meta["max_rooms"],
+        room_min_size=world_meta["room_min_size"],
+        room_max_size=world_meta["room_max_size"],
+        resample_rejected_rooms=world_meta.get("resample_rejected_rooms", False),
+        spawn_tables_path=world_meta.get("spawn_tables_path"),
+        current_floor=world_meta["current_floor"],
+        pregenerate=world_meta["pregenerate"],
+        max_resident_floors=world_meta["max_resident_floors"],
+        floor_directory=world_meta["floor_directory"],
+    )
+    world.seed = world_meta["seed"]
+    for spilled in world_meta["spilled_floors"]:
+        if isinstance(spilled, int):  # Older saves only list the floors, which were kept in one file per floor.
+            world.spilled_floors[spilled] = f"floor_{spilled}.sav"
+        else:
+            floor, name = spilled
+            world.spilled_floors[floor] = name
+    missing = sorted(floor for floor in world.spilled_floors if not os.path.exists(world.floor_path(floor)))
+    if missing:
+        raise ValueError(f"The files of floors {missing} are missing from {world.floor_directory}.")
+    for floor in world_meta["resident_floors"]:
+        game_map = _read_floor(save, floor)
+        game_map.engine = engine
+        world.resident_floors[floor] = game_map
+    _place_floor_entities(table, entities, world.resident_floors)
+
+    engine.game_world = world
+    engine.game_map = world.resident_floors[world.current_floor]
+    return engine
+
+
+def save_floor(game_map: game.game_map.GameMap, path: str, *, compression: str = "zlib") -> None:
+    """Save a single floor and its entities to `path`."""
+    sections = _floor_sections(0, game_map)
+    entity_table = _EntityTableWriter()
+    for entity in game_map.entities:
+        entity_table.add(entity, floor=0)
+    sections.update(entity_table.sections())
+    write_sections(path, sections, compression)
+
+
+def load_floor(path: str) -> game.game_map.GameMap:
+    """Load a floor saved with `save_floor`, the returned map has no engine."""
+    save = SaveFile(path)
+    game_map = _read_floor(save, 0)
+    table, entities = _read_entities(save)
+    _place_floor_entities(table, entities, {0: game_map})
+    return game_map
@@ -2,11 +2,10 @@
 
 from __future__ import annotations
 
-from typing import Optional
-import copy
-import lzma
-import pickle
+from typing import List, Optional
+import os
 import traceback
+import uuid
 
 from PIL import Image
 from tcod import libtcodpy
@@ -19,26 +18,51 @@
 import game.game_map
 import game.input_handlers
 import game.procgen
+import game.serialization
 
 # Load the background image and remove the alpha channel.
 background_image = np.array(Image.open("data/menu_background.png").convert("RGB"))
 
 
-def new_game() -> game.engine.Engine:
-    """Return a brand new game session as an Engine instance."""
-    map_width = 80
-    map_height = 43
+def new_game(
+    *,
+    save_path: Optional[str] = None,
+    pregenerate_floors: Optional[bool] = None,
+    map_width: int = 80,
+    map_height: int = 43,
+) -> game.engine.Engine:
+    """Return a brand new game session as an Engine instance.
+
+    If `save_path` is given then evicted floors and archived messages are kept in a new directory inside the `.floors`
+    directory next to it.  The files of games saved there before are deleted once this game is saved over them, see
+    `GameWorld.remove_unused_floor_files`.  Otherwise they go to a temporary directory.
+
+    Maps larger than the 80 by 43 map view scroll to follow the player.
+
+    If `pregenerate_floors` is True then each next floor is generated in the background.  By default this is only done
+    when there is more than one CPU, otherwise the worker would just compete with the game for the same CPU.
+    """
+    if pregenerate_floors is None:
+        pregenerate_floors = (os.cpu_count() or 1) > 1
 
     room_max_size = 10
     room_min_size = 6
     max_rooms = 30
 
-    player = copy.deepcopy(game.entity_factories.player)
+    floor_directory = None
+    replaced_directories: List[str] = []
+    if save_path is not None:
+        games_directory = f"{save_path}.floors"
+        if os.path.isdir(games_directory):  # Still used by the current save until this game replaces it.
+            replaced_directories = [os.path.join(games_directory, name) for name in os.listdir(games_directory)]
+        floor_directory = os.path.join(games_directory, uuid.uuid4().hex)
+
+    player = game.entity_factories.spawn(game.entity_factories.player)
 
     engine = game.engine.Engine(player=player)
 
-    dagger = copy.deepcopy(game.entity_factories.dagger)
-    leather_armor = copy.deepcopy(game.entity_factories.leather_armor)
+    dagger = game.entity_factories.spawn(game.entity_factories.dagger)
+    leather_armor = game.entity_factories.spawn(game.entity_factories.leather_armor)
 
     dagger.parent = player.inventory
     leather_armor.parent = player.inventory
@@ -56,20 +80,28 @@ def new_game() -> game.engine.Engine:
         room_max_size=room_max_size,
         map_width=map_width,
         map_height=map_height,
+        pregenerate=pregenerate_floors,
+        floor_directory=floor_directory,
     )
-    engine.game_world.generate_floor()
+    engine.game_world.replaced_directories = replaced_directories
+    engine.game_world.descend()
     engine.update_fov()
 
+    # Old messages are archived next to the evicted floors of this game.
+    engine.message_log.archive_path = os.path.join(engine.game_world.floor_directory, "messages.jsonl")
+
     engine.message_log.add_message("Hello and welcome, adventurer, to yet another dungeon!", game.color.welcome_text)
     return engine
 
 
-def load_game(filename: str) -> game.engine.Engine:
-    """Load an Engine instance from a file."""
-    with open(filename, "rb") as f:
-        engine = pickle.loads(lzma.decompress(f.read()))
-    assert isinstance(engine, game.engine.Engine)
-    return engine
+def load_game(filename: str, *, mmap: bool = False) -> game.engine.Engine:
+    """Load an Engine instance from a file.
+
+    Saves from older versions, which pickled the whole Engine, are not compatible and raise ValueError.
+    """
+    if not game.serialization.is_save_file(filename):
+        raise ValueError("This save is from an older version of the game and is incompatible.\nStart a new game.")
+    return game.serialization.load_engine(filename, mmap=mmap)
 
 
 class MainMenu(game.input_handlers.BaseEventHandler):
@@ -118,6 +150,6 @@ def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[game.input_handlers.
                 traceback.print_exc()  # Print to stderr.
                 return game.input_handlers.PopupMessage(self, f"Failed to load save:\n{exc}")
         elif event.sym == tcod.event.KeySym.N:
-            return game.input_handlers.MainGameEventHandler(new_game())
+            return game.input_handlers.MainGameEventHandler(new_game(save_path="savegame.sav"))
 
         return None
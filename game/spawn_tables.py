@@ -0,0 +1,122 @@
+"""Weighted tables of what to spawn on each floor, compiled for sampling many spawns at once.
+
+Tables can be loaded from a JSON file of the form:
+
+    {
+        "monsters": {
+            "max_per_room": [[1, 2], [4, 3], [6, 5]],
+            "chances": {"0": {"orc": 80}, "3": {"troll": 15}}
+        },
+        "items": {...}
+    }
+
+`max_per_room` is a list of `[first_floor, value]` pairs in order of floor.  `chances` maps the first floor an entry
+applies to onto the weights of prototype ids from `game.entity_factories.prototypes`, a later floor can change the
+weight of an earlier entry.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Mapping, Sequence, Tuple
+import bisect
+import functools
+import json
+
+from numpy.typing import NDArray
+import numpy as np
+
+import game.entity
+import game.entity_factories
+
+
+class FloorSpawnTable:
+    """The chances of a `SpawnTable` as of one floor, set up for sampling with the alias method.
+
+    Each sample takes one random column and one random number, however many prototypes the table has.
+    """
+
+    def __init__(self, weights: Mapping[game.entity.Entity, int]):
+        self.prototypes = list(weights)
+        count = len(self.prototypes)
+        self.probability = np.ones(count, dtype=np.float64)  # Chance of keeping a column instead of its alias.
+        self.alias = np.arange(count, dtype=np.intp)
+        total = sum(weights.values())
+        if not count or total <= 0:
+            return
+        # Vose's alias method.  Columns are scaled so that the average is 1, then each column below 1 is topped up from
+        # one above 1.
+        scaled = [weight * count / total for weight in weights.values()]
+        small = [index for index, value in enumerate(scaled) if value < 1]
+        large = [index for index, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # Anything left is 1 up to rounding error, its probability is already 1.
+
+    def sample(self, rng: np.random.Generator, count: int) -> NDArray[np.intp]:
+        """Return the indexes into `prototypes` of `count` random picks."""
+        if not self.prototypes:
+            return np.zeros(0, dtype=np.intp)
+        columns = rng.integers(len(self.prototypes), size=count)
+        keep = rng.random(count) < self.probability[columns]
+        return np.where(keep, columns, self.alias[columns])
+
+
+class SpawnTable:
+    """What can spawn on each floor and how many of them to spawn per room.
+
+    `chances_by_floor` maps the first floor of each entry onto weighted prototypes, a later floor can change the weight
+    of an earlier prototype.  `max_by_floor` is a list of `(first_floor, value)` in order of floor.
+    """
+
+    def __init__(
+        self,
+        chances_by_floor: Mapping[int, Sequence[Tuple[game.entity.Entity, int]]],
+        max_by_floor: Sequence[Tuple[int, int]],
+    ):
+        self._first_floors = sorted(chances_by_floor)
+        self._chances = [chances_by_floor[floor] for floor in self._first_floors]
+        self._max_first_floors = [floor for floor, _ in max_by_floor]
+        self._max_values = [value for _, value in max_by_floor]
+        # Compiled tables by the number of `chances_by_floor` entries they include.
+        self._compiled: Dict[int, FloorSpawnTable] = {}
+
+    def max_for_floor(self, floor: int) -> int:
+        """Return the most of these entities to spawn in a room on this floor."""
+        index = bisect.bisect_right(self._max_first_floors, floor)
+        return self._max_values[index - 1] if index else 0
+
+    def for_floor(self, floor: int) -> FloorSpawnTable:
+        """Return the compiled chances of this floor, shared by every floor with the same chances."""
+        entries = bisect.bisect_right(self._first_floors, floor)
+        table = self._compiled.get(entries)
+        if table is None:
+            weights: Dict[game.entity.Entity, int] = {}
+            for chances in self._chances[:entries]:
+                for prototype, weight in chances:
+                    weights[prototype] = weight
+            table = self._compiled[entries] = FloorSpawnTable(weights)
+        return table
+
+    @classmethod
+    def from_json(cls, data: Mapping[str, Any]) -> SpawnTable:
+        """Return a table from its JSON form, see the module docstring."""
+        chances_by_floor = {
+            int(floor): [
+                (game.entity_factories.prototypes[prototype_id], weight) for prototype_id, weight in weights.items()
+            ]
+            for floor, weights in data["chances"].items()
+        }
+        return cls(chances_by_floor, [(floor, value) for floor, value in data["max_per_room"]])
+
+
+@functools.lru_cache(maxsize=None)
+def load_spawn_tables(path: str) -> Dict[str, SpawnTable]:
+    """Return the "monsters" and "items" tables from a JSON file, each file is only read once."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {kind: SpawnTable.from_json(data[kind]) for kind in ("monsters", "items")}
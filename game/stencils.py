@@ -0,0 +1,43 @@
+"""Cached offsets and masks of the tiles within a radius, shared by area effects, their targeting previews and queries.
+
+A tile is within `radius` of a center when its Euclidean distance from the center is at most `radius`, the same test
+as `Entity.distance(x, y) <= radius`.
+"""
+
+from __future__ import annotations
+
+from typing import Tuple
+import functools
+
+from numpy.typing import NDArray
+import numpy as np
+
+
+@functools.lru_cache(maxsize=None)
+def disk_offsets(radius: int) -> Tuple[NDArray[np.intp], NDArray[np.intp]]:
+    """Return the (dx, dy) offsets of the tiles within `radius` of a center, nearest first.
+
+    Offsets at the same distance are ordered by dy and then dx, as `nearest_first` orders positions.
+    """
+    dx, dy = np.nonzero(disk_mask(radius))
+    dx -= radius
+    dy -= radius
+    order = np.lexsort((dx, dy, dx * dx + dy * dy))
+    dx, dy = dx[order], dy[order]
+    dx.flags.writeable = dy.flags.writeable = False
+    return dx, dy
+
+
+@functools.lru_cache(maxsize=None)
+def disk_mask(radius: int) -> NDArray[np.bool_]:
+    """Return a (2 * radius + 1) square mask of the tiles within `radius` of its center tile."""
+    offsets = np.arange(-radius, radius + 1)
+    mask: NDArray[np.bool_] = offsets[:, np.newaxis] ** 2 + offsets[np.newaxis, :] ** 2 <= radius * radius
+    mask.flags.writeable = False
+    return mask
+
+
+def nearest_first(x: int, y: int, position: Tuple[int, int]) -> Tuple[int, int, int]:
+    """Sort key putting positions nearest to (x, y) first, in the same order as `disk_offsets`."""
+    dx, dy = position[0] - x, position[1] - y
+    return dx * dx + dy * dy, dy, dx
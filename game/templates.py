@@ -0,0 +1,91 @@
+"""Fast copies of entity prototypes.
+
+`copy.deepcopy` rediscovers the layout of a prototype every time it is copied, going through the copy protocol for each
+object and memoizing every value it visits.  A `Template` walks the slots of a prototype once and records which values
+can be shared and which objects have to be created, after which each copy only creates those objects and assigns their
+slots.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Generic, Iterator, List, Tuple, TypeVar
+import enum
+
+import game.entity
+
+T = TypeVar("T", bound=game.entity.Entity)
+
+_IMMUTABLE_TYPES = (type(None), bool, int, float, str, enum.Enum)
+
+
+def _slot_names(cls: type) -> Iterator[str]:
+    """Yield the names of every slot of a class, including those of its bases."""
+    for base in reversed(cls.__mro__):
+        slots = base.__dict__.get("__slots__", ())
+        yield from (slots,) if isinstance(slots, str) else slots
+
+
+def _is_immutable(value: Any) -> bool:
+    """Return True if a value can be shared between copies."""
+    if isinstance(value, tuple):
+        return all(_is_immutable(item) for item in value)
+    return isinstance(value, _IMMUTABLE_TYPES)
+
+
+class Template(Generic[T]):
+    """Creates copies of a prototype entity, along with its components.
+
+    The prototype is compiled when the template is made, changes to the prototype after that are not seen by the
+    template.  Every object reachable from the prototype must either be immutable, a list, or use `__slots__`.
+    """
+
+    def __init__(self, prototype: T):
+        self.prototype = prototype
+        self._classes: List[type] = []  # The class of each object to create, the entity first.
+        self._values: List[Tuple[int, str, Any]] = []  # (object, slot, value) for values shared by every copy.
+        self._references: List[Tuple[int, str, int]] = []  # (object, slot, object) for references between objects.
+        self._lists: List[Tuple[int, str, List[Tuple[bool, Any]]]] = []  # (object, slot, [(is_reference, item)]).
+        self._indexes: Dict[int, int] = {}  # Object index by id() of the prototype's objects.
+        self._compile(prototype)
+        del self._indexes
+
+    def _compile(self, obj: object) -> int:
+        """Record how to create an object of the prototype and return its index."""
+        index = self._indexes.get(id(obj))
+        if index is not None:
+            return index
+        cls = type(obj)
+        if hasattr(obj, "__dict__"):
+            raise TypeError(f"{cls.__name__} objects can not be templated since they do not use __slots__.")
+        index = self._indexes[id(obj)] = len(self._classes)
+        self._classes.append(cls)
+        for name in _slot_names(cls):
+            try:
+                value = getattr(obj, name)
+            except AttributeError:
+                continue  # Unset slots are left unset.
+            if _is_immutable(value):
+                self._values.append((index, name, value))
+            elif isinstance(value, list):
+                self._lists.append((index, name, [self._compile_item(item) for item in value]))
+            else:
+                self._references.append((index, name, self._compile(value)))
+        return index
+
+    def _compile_item(self, item: Any) -> Tuple[bool, Any]:
+        """Return how to copy an item of a list, as (is_reference, value or object index)."""
+        if _is_immutable(item):
+            return False, item
+        return True, self._compile(item)
+
+    def spawn(self) -> T:
+        """Return a new copy of the prototype, not placed anywhere."""
+        objects: List[Any] = [object.__new__(cls) for cls in self._classes]
+        for index, name, value in self._values:
+            setattr(objects[index], name, value)
+        for index, name, target in self._references:
+            setattr(objects[index], name, objects[target])
+        for index, name, items in self._lists:
+            setattr(objects[index], name, [objects[item] if is_reference else item for is_reference, item in items])
+        entity: T = objects[0]
+        return entity
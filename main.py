@@ -1,4 +1,7 @@
 #!/usr/bin/env python3
+import multiprocessing
+import os
+import time
 import traceback
 
 import tcod
@@ -9,23 +12,33 @@
 from game.input_handlers import BaseEventHandler, MainGameEventHandler
 from game.procgen import generate_dungeon
 from game.setup_game import MainMenu
+import game.autosave
 import game.entity_factories
+import game.frames
+import game.metrics
 
 
-def save_game(handler: game.input_handlers.BaseEventHandler, filename: str) -> None:
+def save_game(handler: game.input_handlers.BaseEventHandler, filename: str, autosaver: game.autosave.Autosaver) -> None:
     """If the current event handler has an active Engine then save it."""
+    autosaver.close()  # Don't let an older autosave finish after this save.
     if isinstance(handler, game.input_handlers.EventHandler):
         handler.engine.save_as(filename)
+        handler.engine.game_world.remove_unused_floor_files()  # Only the save just written refers to them now.
         print("Game saved.")
 
 
 def main() -> None:
     screen_width = 80
     screen_height = 50
+    autosave_interval = 50  # Turns between autosaves.
+    metrics_path = os.environ.get("YARL_METRICS")  # If set then timings are written to this JSON or CSV file on exit.
+    game.metrics.registry.enabled = bool(metrics_path)
 
     tileset = tcod.tileset.load_tilesheet("data/dejavu10x10_gs_tc.png", 32, 8, tcod.tileset.CHARMAP_TCOD)
 
     handler: game.input_handlers.BaseEventHandler = MainMenu()
+    autosaver = game.autosave.Autosaver("savegame.sav", interval=autosave_interval)
+    frame_stats = game.frames.FrameStats()
 
     with tcod.context.new(
         columns=screen_width,
@@ -35,17 +48,33 @@ def main() -> None:
         vsync=True,
     ) as context:
         root_console = tcod.console.Console(screen_width, screen_height, order="F")
+        redraw_tracker = game.frames.RedrawTracker()
+        dirty = True  # Only draw again once something on screen may have changed.
         try:
             while True:
-                root_console.clear()
-                handler.on_render(console=root_console)
-                context.present(root_console)
+                if dirty:
+                    start = time.perf_counter()
+                    root_console.clear()
+                    handler.on_render(console=root_console)
+                    rendered = time.perf_counter()
+                    context.present(root_console)
+                    frame_stats.add_frame(rendered - start, time.perf_counter() - rendered)
+                    dirty = False
 
                 try:
-                    for event in tcod.event.wait():
+                    events = list(tcod.event.wait())  # Blocks until there is at least one event.
+                    start = time.perf_counter()
+                    coalesced = game.frames.coalesce_events(events)
+                    for event in coalesced:
                         event = context.convert_event(event)
+                        previous_handler = handler
                         handler = handler.handle_events(event)
+                        dirty |= handler is not previous_handler or redraw_tracker.needs_redraw(event)
+                    if isinstance(handler, game.input_handlers.EventHandler):
+                        autosaver.on_turn(handler.engine)
+                    frame_stats.add_events(time.perf_counter() - start, len(coalesced), len(events) - len(coalesced))
                 except Exception:  # Handle exceptions in game.
+                    dirty = True
                     traceback.print_exc()  # Print error to stderr.
                     # Then print the error to the message log.
                     if isinstance(handler, game.input_handlers.EventHandler):
@@ -53,12 +82,17 @@ def main() -> None:
         except QuitWithoutSaving:
             raise
         except SystemExit:  # Save and quit.
-            save_game(handler, "savegame.sav")
+            save_game(handler, "savegame.sav", autosaver)
             raise
         except BaseException:  # Save on any other unexpected exception.
-            save_game(handler, "savegame.sav")
+            save_game(handler, "savegame.sav", autosaver)
             raise
+        finally:
+            if metrics_path:
+                print(f"Frame timings: {frame_stats.summary()}")
+                game.metrics.registry.dump(metrics_path)
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Needed for floor generation workers in frozen builds.
     main()